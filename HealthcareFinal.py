@@ -1,30 +1,28 @@
-import pandas as pd
-import folium
-from folium import Choropleth
-from folium.plugins import FloatImage
-from branca.colormap import linear
-from streamlit_folium import st_folium
-import geopandas as gpd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
 import streamlit as st
 
-# Load your data
-df = pd.read_csv("https://raw.githubusercontent.com/hadilfs/Healthcare/main/combined_data.csv")
-df = df[df['val'] > 0]
-
-df1 = pd.read_csv("https://raw.githubusercontent.com/hadilfs/Healthcare/main/AllRegions.csv")
-df1 = df1[df1['val'] > 0]
-
-# Load the shapefile for MENA region
-shapefile_url = "https://raw.githubusercontent.com/hadilfs/Healthcare/main/MENA.geo.json"
-mena_shapefile = gpd.read_file(shapefile_url)
+from page_loader import load_page, startup_report
+from profiling import debug_enabled, debug_panel, finish_run, section, start_run
 
 # Sidebar for navigation
 st.sidebar.title("Navigation")
 page = st.sidebar.radio("Go to", ["Home", "EDA", "Dashboard", "Conclusion"])
 
+# Time every section of this rerun; the performance panel and profiler are opt-in (HEALTHCARE_DEBUG=1 or ?debug=1)
+debug = debug_enabled()
+start_run(page, st.session_state.get("profiler", "Off") if debug else "Off")
+
+# Import and load only what the selected page declares; later visits find it all warm
+data = load_page(page)
+
+# Optional 95% uncertainty bands, propagated from the GBD upper/lower bounds of every row
+if page in ("EDA", "Dashboard"):
+    uncertainty = st.sidebar.radio(
+        "Uncertainty intervals", ["Off", "Independent", "Correlated"],
+        help="Independent assumes row errors are unrelated and gives the narrowest band; "
+             "Correlated assumes they all move together and gives the widest."
+    )
+    how = None if uncertainty == "Off" else uncertainty.lower()
+
 # Home page
 if page == "Home":
     st.image("https://raw.githubusercontent.com/hadilfs/Healthcare/main/AUBlogo.png", use_column_width=True)
@@ -41,52 +39,83 @@ if page == "Home":
 
 # EDA page
 elif page == "EDA":
+    import folium
+    from branca.colormap import linear
+    from streamlit_folium import st_folium
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    import plotly.express as px
+
+    from charts import show_chart
+    from correlation import load_correlations
+    from data_store import dataset_key
+    from geometry import load_shapes, with_values
+    from time_map import year_choropleth
+    from trends import show_trends, trend_matrix
+    from uncertainty import interval_errors, summary
+
+    # Raw global data plus pre-aggregated rollups of both datasets
+    df1, cube, cube1 = data['df1'], data['cube'], data['cube1']
+
     st.title("Exploratory Data Analysis")
+
+    def show_map(m):
+        # In debug mode also measure the HTML sent for the map, at the cost of rendering it twice
+        if debug:
+            with section('folium html') as info:
+                info['payload_bytes'] = len(m.get_root().render())
+        with section('st_folium'):
+            st_folium(m, width=700, height=500, returned_objects=[])
     
     # Other EDA plots and visualizations
     st.subheader("Deaths by Diabetes Type 2 by Sex Globally")
-    plt.figure(figsize=(6, 4))
-    sns.boxplot(x='sex', y='val', data=df1, hue='sex', palette=['#8B0000', '#d19999'], legend=False)
-    plt.title('Deaths by Diabetes Type 2 by Sex')
-    plt.xlabel('Sex')
-    plt.ylabel('Deaths (Percent)')
-    plt.yticks([])
-    st.pyplot(plt)
+    def sex_boxplot(df1):
+        sns.boxplot(x='sex', y='val', data=df1, hue='sex', palette=['#8B0000', '#d19999'], legend=False)
+        plt.title('Deaths by Diabetes Type 2 by Sex')
+        plt.xlabel('Sex')
+        plt.ylabel('Deaths (Percent)')
+        plt.yticks([])
+    # Keyed on the dataset version: hashing every raw row on each rerun would cost more than the cache saves
+    show_chart(sex_boxplot, df1, figsize=(6, 4), data_key=dataset_key("AllRegions.csv"))
     st.write("The lack of a notable shift between the two boxplots indicates that there isn’t a strong association between sex and the percentage of deaths due to diabetes type 2 in the data provided. Both males and females appear to be equally impacted by diabetes type 2 in terms of mortality. This suggests that interventions and policies aimed at reducing diabetes-related deaths should be gender-neutral, focusing on broader population health strategies rather than targeting one gender over the other.")
 
     st.subheader("Distribution of Deaths by Age Group Globally")
-    df_sorted = df1.sort_values('age')
-    plt.figure(figsize=(14, 6))
-    sns.barplot(x='age', y='val', data=df_sorted, color='#8B0000', errorbar=None)
-    plt.title('Distribution of Deaths by Age Group')
-    plt.xlabel('Age Group')
-    plt.ylabel('Deaths (Percent)')
-    plt.yticks([])
-    st.pyplot(plt)
+    age_means = summary(cube1, 'age', how=how, statistic='mean').sort_values('age', ignore_index=True)
+    def age_bars(age_means):
+        sns.barplot(x='age', y='val', data=age_means, color='#8B0000', errorbar=None)
+        if 'lower' in age_means:
+            plt.errorbar(range(len(age_means)), age_means['val'], yerr=interval_errors(age_means), fmt='none', ecolor='black', capsize=4)
+        plt.title('Distribution of Deaths by Age Group')
+        plt.xlabel('Age Group')
+        plt.ylabel('Deaths (Percent)')
+        plt.yticks([])
+    show_chart(age_bars, age_means, figsize=(14, 6))
     st.write("The age group 20-24 years has the highest percentage of deaths due to Type 2 diabetes, significantly higher than any other age group. All other age groups have relatively similar and lower percentages, showing a consistent distribution across ages above 25 years.")
     
     st.subheader("Deaths by Diabetes Type 2 Over Time Globally")
-    mena_data = df1.groupby('year')['val'].sum().reset_index()
-    plt.figure(figsize=(10, 6))
-    plt.plot(mena_data['year'], mena_data['val'], marker='o', linestyle='-', color='#8B0000')
-    plt.title('Deaths by Diabetes Type 2 Over Time Globally')
-    plt.xlabel('Year')
-    plt.ylabel('Total Deaths (Percent)')
-    plt.yticks([])
-    plt.grid(False)
-    st.pyplot(plt)
+    mena_data = summary(cube1, 'year', how=how)
+    def global_trend(mena_data):
+        plt.plot(mena_data['year'], mena_data['val'], marker='o', linestyle='-', color='#8B0000')
+        if 'lower' in mena_data:
+            plt.fill_between(mena_data['year'], mena_data['lower'], mena_data['upper'], color='#d19999', alpha=0.5)
+        plt.title('Deaths by Diabetes Type 2 Over Time Globally')
+        plt.xlabel('Year')
+        plt.ylabel('Total Deaths (Percent)')
+        plt.yticks([])
+        plt.grid(False)
+    show_chart(global_trend, mena_data, figsize=(10, 6))
     st.write(" The overall upward trend indicates a growing global health burden of Type 2 diabetes. The dip in 2018 might be attributed to underreporting, changes in data collection methods, or temporary improvements in diabetes management. The sharp rise post-2018 highlights the resurgence of diabetes-related complications or potential impacts of external factors such as pandemics affecting diabetic patients.")
     
     st.subheader("Distribution of Deaths by Region")
-    region_distribution = df1.groupby('location')['val'].sum().reset_index()
+    region_distribution = summary(cube1, 'location', how=how)
     region_distribution = region_distribution.sort_values('val', ascending=False)
-    plt.figure(figsize=(10, 8))
-    plt.barh(region_distribution['location'], region_distribution['val'], color='#8B0000')
-    plt.xlabel('Total Deaths (Percent)')
-    plt.ylabel('Region')
-    plt.xticks([])
-    plt.grid(axis='y', linestyle='', alpha=0.7)
-    st.pyplot(plt)
+    def region_bars(region_distribution):
+        plt.barh(region_distribution['location'], region_distribution['val'], xerr=interval_errors(region_distribution), color='#8B0000')
+        plt.xlabel('Total Deaths (Percent)')
+        plt.ylabel('Region')
+        plt.xticks([])
+        plt.grid(axis='y', linestyle='', alpha=0.7)
+    show_chart(region_bars, region_distribution, figsize=(10, 8))
     st.write("1. North America leads with the highest percentage of deaths due to Type 2 diabetes, highlighting the severe impact of this disease in a region known for high obesity rates and sedentary lifestyles.")
     st.write("2. North Africa and the Middle East (MENA) also have a substantial percentage, reflecting the region's growing diabetes burden, likely driven by urbanization, lifestyle changes, and dietary factors.")
     st.write("3. Europe & Central Asia and Latin America and the Caribbean follow closely, indicating that diabetes is a significant health issue in both developed and developing countries.")
@@ -94,92 +123,83 @@ elif page == "EDA":
     st.write("5. South Asia has the lowest percentage, though diabetes remains a critical issue there, particularly due to genetic predispositions and rapid changes in lifestyle.")
     
     st.subheader("Total Deaths Over the Years in the MENA Region")
-    mena_data = df.groupby('year')['val'].sum().reset_index()
-    plt.figure(figsize=(10, 6))
-    plt.plot(mena_data['year'], mena_data['val'], marker='o', linestyle='-', color='#8B0000')
-    plt.xlabel('Year')
-    plt.ylabel('Total Deaths (Percent)')
-    plt.yticks([])
-    plt.grid(False)
-    st.pyplot(plt)
+    mena_data = summary(cube, 'year', how=how)
+    def mena_trend(mena_data):
+        plt.plot(mena_data['year'], mena_data['val'], marker='o', linestyle='-', color='#8B0000')
+        if 'lower' in mena_data:
+            plt.fill_between(mena_data['year'], mena_data['lower'], mena_data['upper'], color='#d19999', alpha=0.5)
+        plt.xlabel('Year')
+        plt.ylabel('Total Deaths (Percent)')
+        plt.yticks([])
+        plt.grid(False)
+    show_chart(mena_trend, mena_data, figsize=(10, 6))
     st.write("The analysis of the above line chart reveals a concerning increase in the percentage of deaths attributable to Type 2 diabetes across the MENA region. This trend suggests a growing burden of the disease, likely driven by lifestyle changes, urbanization, and the rising prevalence of obesity—a known risk factor for Type 2 diabetes. The continuous upward trajectory in mortality rates emphasizes the need for urgent interventions to curb the rising tide of diabetes-related deaths.")
 
     st.subheader("Trends in Deaths by Diabetes Type 2 Over Time in Each MENA Region Country")
-    plt.figure(figsize=(16, 12))
-    ax = sns.lineplot(x='year', y='val', hue='location', data=df, errorbar=None, legend=False)
-    locations = df['location'].unique()
-    for location in locations:
-        line = ax.get_lines()[list(df['location'].unique()).index(location)]
-        color = line.get_color()
-        x_data = line.get_xdata()
-        y_data = line.get_ydata()
-        if len(x_data) > 0 and len(y_data) > 0:
-            ax.text(x_data[-1], y_data[-1], location, color=color, ha='left', va='center', fontsize=10)
-    plt.xlabel('Year')
-    plt.ylabel('Deaths (Percent)')
-    plt.yticks([])
-    st.pyplot(plt)
+    # One WebGL line per country from the year x country matrix; hovering a line highlights it
+    country_trends = trend_matrix(cube)
+    countries = st.multiselect("Countries", list(country_trends.columns), placeholder="All countries")
+    show_trends(country_trends, countries)
 
     # Group by 'year' and 'location_name', and sum the 'val' column
-    grouped_df = df.groupby(['year', 'location'], as_index=False)['val'].sum()
+    grouped_df = cube.total('year', 'location')
 
     # Streamlit UI elements for year selection
     st.subheader("Distribution of Deaths by Diabetes Type 2 by Country in the MENA Region")
-    year = st.slider("Select Year", int(grouped_df['year'].min()), int(grouped_df['year'].max()), step=1)
-
-    # Filter data
-    filtered_data = grouped_df[grouped_df['year'] == year]
-
-    # Rename columns to match shapefile
-    filtered_data = filtered_data.rename(columns={'location': 'name', 'val': 'death_rate'})
-
-    # Merging filtered data with shapefile data
-    merged_data = mena_shapefile.merge(filtered_data, left_on='name', right_on='name', how='left')
-
-    # Map Visualization using Folium
-    m = folium.Map(location=[25, 45], zoom_start=4)
-
-    # Define the color scale
-    colormap = linear.Reds_09.scale(filtered_data['death_rate'].min(), filtered_data['death_rate'].max())
-    colormap.caption = 'Total Deaths (Percent)'
-
-    # Adding the merged GeoDataFrame to the map with a color scale and tooltips
-    Choropleth(
-        geo_data=merged_data,
-        data=filtered_data,
-        columns=['name', 'death_rate'],
-        key_on='feature.properties.name',
-        fill_color='Reds',
-        fill_opacity=0.7,
-        line_opacity=0.2,
-        legend_name='Total Deaths (Percent)'
-    ).add_to(m)
-
-    # Add tooltips to show the rate on hover
-    folium.GeoJson(
-        merged_data,
-        style_function=lambda feature: {
-            'fillColor': colormap(feature['properties']['death_rate']) if feature['properties']['death_rate'] else 'gray',
-            'color': 'black',
-            'weight': 1,
-            'fillOpacity': 0.7,
-        },
-        tooltip=folium.GeoJsonTooltip(
-            fields=['name', 'death_rate'],
-            aliases=['Country:', 'Rate:'],
-            localize=True
-        )
-    ).add_to(m)
+    animate = st.toggle("Animate years in the browser", value=True)
+    zoom = 4
+
+    if animate:
+        # Geometry and the year x country matrix are sent once; the map recolors itself per year
+        yearly_rates = grouped_df.rename(columns={'location': 'name', 'val': 'death_rate'})
+        with section('map build'):
+            m = year_choropleth(load_shapes(), yearly_rates, 'death_rate', 'Total Deaths (Percent)', location=[25, 45], zoom=zoom)
+        show_map(m)
+    else:
+        year = st.slider("Select Year", int(grouped_df['year'].min()), int(grouped_df['year'].max()), step=1)
+
+        # Filter data
+        filtered_data = grouped_df[grouped_df['year'] == year]
+
+        # Rename columns to match shapefile
+        filtered_data = filtered_data.rename(columns={'location': 'name', 'val': 'death_rate'})
+
+        # Attach the rates to the simplified MENA shapes
+        with section('merge'):
+            merged_data = with_values(load_shapes(), dict(zip(filtered_data['name'], filtered_data['death_rate'])), 'death_rate')
+
+        # Map Visualization using Folium
+        m = folium.Map(location=[25, 45], zoom_start=zoom)
 
-    # Add colormap to the map
-    colormap.add_to(m)
+        # Define the color scale
+        colormap = linear.Reds_09.scale(filtered_data['death_rate'].min(), filtered_data['death_rate'].max())
+        colormap.caption = 'Total Deaths (Percent)'
 
-    # Display the map
-    st_folium(m, width=700, height=500)
+        # A single layer carries both the fill and the tooltip showing the rate on hover
+        folium.GeoJson(
+            merged_data,
+            style_function=lambda feature: {
+                'fillColor': colormap(feature['properties']['death_rate']) if feature['properties']['death_rate'] else 'gray',
+                'color': 'black',
+                'weight': 1,
+                'fillOpacity': 0.7,
+            },
+            tooltip=folium.GeoJsonTooltip(
+                fields=['name', 'death_rate'],
+                aliases=['Country:', 'Rate:'],
+                localize=True
+            )
+        ).add_to(m)
+
+        # Add colormap to the map
+        colormap.add_to(m)
+
+        # Display the map (panning and zooming stay in the browser instead of rerunning the app)
+        show_map(m)
     st.write("This choropleth map visually represents the mortality rates due to Diabetes Type 2 across different countries in the MENA region. The varying shades of red indicate the severity of the mortality rates, with darker shades representing higher percentages of deaths attributed to the disease. The map highlights Kuwait as having the highest mortality rate, followed by countries like Saudi Arabia, Egypt, and Iraq, which also show significant rates. This suggests that these nations face substantial challenges in managing and preventing Diabetes Type 2, making them critical targets for public health interventions.")
     
     st.subheader("Distribution of Risk Factors in the MENA Region")
-    risk_factors = df.groupby('rei')['val'].sum().reset_index()
+    risk_factors = cube.total('rei')
     fig = px.treemap(
         risk_factors,
         path=['rei'],
@@ -193,19 +213,41 @@ elif page == "EDA":
         height=500,
         margin=dict(t=50, b=50, l=50, r=50)
     )
-    st.plotly_chart(fig)
+    with section('treemap'):
+        st.plotly_chart(fig)
     st.write("This treemap visualization provides a clear overview of the predominant risk factors contributing to Diabetes Type 2 mortality in the MENA region. The size of each box represents the relative impact of each risk factor. Notably, a high body-mass index stands out as the most significant contributor, followed by poor dietary habits like a diet low in whole grains. This visualization underscores the critical areas for public health intervention to reduce the burden of Diabetes Type 2 in the region.")
     
     st.subheader("Correlation Between Risk Factors in the MENA Region")
-    plt.figure(figsize=(12, 6))
-    correlation_matrix = df.pivot_table(index='location', columns='rei', values='val').corr()
-    sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm')
-    st.pyplot(plt)
+    # Correlation across countries within each sex x age x year slice, combined from per-slice statistics
+    correlations = load_correlations("combined_data.csv")
+    sex_column, age_column, year_column = st.columns(3)
+    slice_filter = {
+        'sex': sex_column.selectbox("Sex", ["All"] + sorted(correlations.slices['sex'].unique())),
+        'age': age_column.selectbox("Age group", ["All"] + sorted(correlations.slices['age'].unique())),
+        'year': year_column.selectbox("Year", ["All"] + sorted(correlations.slices['year'].unique())),
+    }
+    slice_filter = {dimension: None if value == "All" else value for dimension, value in slice_filter.items()}
+    correlation_matrix = correlations.matrix(**slice_filter)
+    def risk_factor_heatmap(correlation_matrix):
+        sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm')
+    show_chart(risk_factor_heatmap, correlation_matrix, figsize=(12, 6))
+    st.markdown("**Most strongly correlated risk factor pairs**")
+    st.dataframe(correlations.top_pairs(5, **slice_filter), hide_index=True)
     st.write("The heatmap illustrates the correlations between various risk factors associated with Diabetes Type 2 in the MENA region. Strong positive correlations are highlighted in red, while strong negative correlations are in blue. For instance, a high body-mass index is positively correlated with other poor dietary choices, such as a diet high in sugar-sweetened beverages and red meat. Understanding these correlations is crucial for designing comprehensive strategies that address multiple risk factors simultaneously, thereby enhancing the effectiveness of public health interventions.")
     
 
 # Dashboard page
 elif page == "Dashboard":
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    import plotly.express as px
+
+    from charts import show_chart
+    from correlation import load_correlations
+    from uncertainty import interval_errors, summary
+
+    cube, cube1 = data['cube'], data['cube1']
+
     st.title("Dashboard: Diabetes Type 2 Analysis in the MENA Region")
 
     # Set the width of the plots
@@ -217,40 +259,44 @@ elif page == "Dashboard":
 
     with col1:
         st.markdown("<h6 style='text-align: center; font-size: 14px;'>Deaths by Diabetes Type 2 Over Time Globally</h6>", unsafe_allow_html=True)
-        mena_data = df1.groupby('year')['val'].sum().reset_index()
-        plt.figure(figsize=(plot_width / 90, plot_height / 90))
-        plt.plot(mena_data['year'], mena_data['val'], marker='o', linestyle='-', color='#8B0000')
-        plt.xlabel('Year')
-        plt.ylabel('Total Deaths (Percent)')
-        plt.yticks([])
-        st.pyplot(plt)
+        mena_data = summary(cube1, 'year', how=how)
+        def global_trend(mena_data):
+            plt.plot(mena_data['year'], mena_data['val'], marker='o', linestyle='-', color='#8B0000')
+            if 'lower' in mena_data:
+                plt.fill_between(mena_data['year'], mena_data['lower'], mena_data['upper'], color='#d19999', alpha=0.5)
+            plt.xlabel('Year')
+            plt.ylabel('Total Deaths (Percent)')
+            plt.yticks([])
+        show_chart(global_trend, mena_data, figsize=(plot_width / 90, plot_height / 90))
     
     with col2:
         st.markdown("<h6 style='text-align: center; font-size: 14px;'>Distribution of Deaths by Region</h6>", unsafe_allow_html=True)
-        region_distribution = df1.groupby('location')['val'].sum().reset_index()
+        region_distribution = summary(cube1, 'location', how=how)
         region_distribution = region_distribution.sort_values('val', ascending=False)
-        plt.figure(figsize=(plot_width / 80, plot_height / 60))
-        plt.barh(region_distribution['location'], region_distribution['val'], color='#8B0000')
-        plt.xlabel('Total Deaths (Percent)')
-        plt.ylabel('Region')
-        st.pyplot(plt)
+        def region_bars(region_distribution):
+            plt.barh(region_distribution['location'], region_distribution['val'], xerr=interval_errors(region_distribution), color='#8B0000')
+            plt.xlabel('Total Deaths (Percent)')
+            plt.ylabel('Region')
+        show_chart(region_bars, region_distribution, figsize=(plot_width / 80, plot_height / 60))
     
     with col3:
         st.markdown("<h6 style='text-align: center; font-size: 14px;'>Total Deaths by Year in the MENA Region</h6>", unsafe_allow_html=True)
-        mena_data = df.groupby('year')['val'].sum().reset_index()
-        plt.figure(figsize=(plot_width / 100, plot_height / 100))
-        plt.plot(mena_data['year'], mena_data['val'], marker='o', linestyle='-', color='#8B0000')
-        plt.xlabel('Year')
-        plt.ylabel('Total Deaths (Percent)')
-        plt.yticks([])
-        st.pyplot(plt)
+        mena_data = summary(cube, 'year', how=how)
+        def mena_trend(mena_data):
+            plt.plot(mena_data['year'], mena_data['val'], marker='o', linestyle='-', color='#8B0000')
+            if 'lower' in mena_data:
+                plt.fill_between(mena_data['year'], mena_data['lower'], mena_data['upper'], color='#d19999', alpha=0.5)
+            plt.xlabel('Year')
+            plt.ylabel('Total Deaths (Percent)')
+            plt.yticks([])
+        show_chart(mena_trend, mena_data, figsize=(plot_width / 100, plot_height / 100))
 
     # Second row of the dashboard with two plots
     col4, col5 = st.columns([1, 1])
 
     with col4:
         st.markdown("<h6 style='text-align: center; font-size: 14px;'>Distribution of Risk Factors in the MENA Region</h6>", unsafe_allow_html=True)
-        risk_factors = df.groupby('rei')['val'].sum().reset_index()
+        risk_factors = cube.total('rei')
         fig = px.treemap(
             risk_factors,
             path=['rei'],
@@ -264,14 +310,15 @@ elif page == "Dashboard":
             height=200,
             margin=dict(t=20, b=20, l=20, r=20)
         )
-        st.plotly_chart(fig)
+        with section('treemap'):
+            st.plotly_chart(fig)
     
     with col5:
         st.markdown("<h6 style='text-align: center; font-size: 14px;'>Correlation Between Risk Factors in the MENA Region</h6>", unsafe_allow_html=True)
-        plt.figure(figsize=(plot_width / 90, plot_height / 100))
-        correlation_matrix = df.pivot_table(index='location', columns='rei', values='val').corr()
-        sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm')
-        st.pyplot(plt)
+        correlation_matrix = load_correlations("combined_data.csv").matrix()
+        def risk_factor_heatmap(correlation_matrix):
+            sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm')
+        show_chart(risk_factor_heatmap, correlation_matrix, figsize=(plot_width / 90, plot_height / 100))
     # Analysis sections
     st.subheader("Global Perspective")
     st.write("""
@@ -294,6 +341,13 @@ elif page == "Dashboard":
     """)
 # Conclusion page
 elif page == "Conclusion":
+    import matplotlib.pyplot as plt
+
+    from charts import show_chart
+    from forecast import load_forecaster, load_total_forecaster
+
+    cube, cube1 = data['cube'], data['cube1']
+
     st.title("Conclusion and Findings")
     st.image("https://raw.githubusercontent.com/hadilfs/Healthcare/main/diabetesImage.jpg", use_column_width=True)
     
@@ -320,6 +374,39 @@ elif page == "Conclusion":
     The findings from the Exploratory Data Analysis (EDA) underscore the complexity of diabetes Type 2 mortality across different demographics and regions. Addressing this global health challenge requires a multi-faceted approach that includes gender-neutral interventions, targeted age-specific programs, global and regional health initiatives, and comprehensive healthcare strategies. By focusing on both clinical and economic aspects, we can better manage and reduce the impact of diabetes Type 2, ultimately improving health outcomes and reducing the burden on healthcare systems worldwide.
     """)
     st.subheader("A Future Forecast of Deaths by Diabetes Type 2 in the MENA Region")
-    st.image("https://raw.githubusercontent.com/hadilfs/Healthcare/main/forecastingResult.png", use_column_width=True)
+    horizon = st.slider("Forecast horizon (years)", 1, 15, 10)
+
+    # Holt's linear trend forecast of the yearly MENA total, refitted whenever the data changes
+    mena_data = cube.total('year')
+    mena_forecast = load_total_forecaster("combined_data.csv").forecast(horizon)
+    def forecast_chart(history, predicted):
+        plt.plot(history['year'], history['val'], marker='o', linestyle='-', color='#8B0000', label='Observed')
+        plt.plot(predicted['year'], predicted['val'], marker='o', linestyle='--', color='#8B0000', label='Forecast')
+        plt.fill_between(predicted['year'], predicted['lower'], predicted['upper'], color='#d19999', alpha=0.5, label='95% prediction interval')
+        plt.xlabel('Year')
+        plt.ylabel('Total Deaths (Percent)')
+        plt.yticks([])
+        plt.legend()
+    show_chart(forecast_chart, mena_data, mena_forecast, figsize=(10, 6))
     st.write("""Our forecasting analysis of Type 2 Diabetes mortality rates in the MENA region reveals a notable trend: the forecast indicates that the high levels of mortality observed in recent years are expected to persist into the foreseeable future. The analysis shows that after an initial period of increasing mortality, the rates have stabilized at elevated levels. This suggests that, barring significant public health interventions or changes in risk factors, the high mortality rates associated with Type 2 Diabetes are likely to remain constant in the coming years. Addressing this issue will require sustained efforts and targeted health policies to mitigate the impact and improve long-term outcomes.""")
 
+    with st.expander("Forecast a single location, risk factor, sex and age group"):
+        dataset = st.radio("Data", ["MENA countries", "Global regions"], horizontal=True)
+        name, series_cube = ("combined_data.csv", cube) if dataset == "MENA countries" else ("AllRegions.csv", cube1)
+        forecaster = load_forecaster(name)
+        choice = {}
+        for dimension, label in [('location', 'Location'), ('rei', 'Risk factor'), ('sex', 'Sex'), ('age', 'Age group')]:
+            matching = forecaster.index
+            for chosen, value in choice.items():
+                matching = matching[matching.get_level_values(chosen) == value]
+            choice[dimension] = st.selectbox(label, matching.get_level_values(dimension).unique())
+        show_chart(forecast_chart, series_cube.total('year', **choice), forecaster.forecast(horizon, **choice), figsize=(10, 6))
+
+# Time each library and dataset took on its first load in this process
+with st.sidebar.expander("Startup report"):
+    st.markdown("\n".join(f"- {kind} `{name}`: {seconds:.2f}s" for kind, name, seconds in startup_report()))
+
+# Log this rerun's sections and, when debugging, show them
+run = finish_run()
+if debug:
+    debug_panel(run)
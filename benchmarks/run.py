@@ -0,0 +1,174 @@
+"""Headless performance benchmarks for HealthcareFinal.py.
+
+Drives every page (and the EDA year slider) through Streamlit's AppTest
+against synthetic GBD-shaped datasets at several multiples of the size of
+AllRegions.csv, using local stand-ins for the files normally fetched from
+GitHub. For each scale and scenario it reports the first-run and warm
+rerun latency, the peak RSS of the process and the bytes sent to the
+browser (script messages plus media such as rendered charts).
+
+    python benchmarks/run.py                      # scales 1, 10, 100
+    python benchmarks/run.py --scales 1 10 100 1000
+    python benchmarks/run.py --save-baseline      # store results as benchmarks/baseline.json
+    python benchmarks/run.py --compare            # exit 1 if worse than the baseline
+
+Each scenario runs in its own process so RSS and caches do not leak
+between measurements.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+APP_DIR = HERE.parent
+APP = APP_DIR / "HealthcareFinal.py"
+BASELINE = HERE / "baseline.json"
+WORK_DIR = HERE / "data"
+
+SCENARIOS = ["Home", "EDA", "EDA year slider", "Dashboard", "Conclusion"]
+
+# Allowed growth over the baseline before a metric counts as a regression
+TOLERANCE = {'first_run_s': 0.25, 'rerun_s': 0.25, 'peak_rss_mb': 0.15, 'payload_bytes': 0.05}
+
+
+def _capture_payloads(sent):
+    """Record the bytes each AppTest script run sends to the browser in ``sent``."""
+    from streamlit import runtime
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+    original = LocalScriptRunner.run
+
+    def run(self, *args, **kwargs):
+        tree = original(self, *args, **kwargs)
+        messages = sum(msg.ByteSize() for msg in self.forward_msgs())
+        storage = runtime.get_instance().media_file_mgr._storage
+        media = sum(len(item.content) for item in getattr(storage, '_files_by_id', {}).values())
+        sent.append(messages + media)
+        return tree
+
+    LocalScriptRunner.run = run
+
+
+def _timed_run(step, payloads):
+    start = time.perf_counter()
+    app = step()
+    elapsed = time.perf_counter() - start
+    if app.exception:
+        raise RuntimeError(app.exception[0].value)
+    return elapsed, payloads[-1]
+
+
+def worker(scenario, repeats):
+    """Run one scenario in this process and print its measurements as JSON."""
+    sys.path.insert(0, str(APP_DIR))
+    from streamlit.testing.v1 import AppTest
+
+    payloads = []
+    _capture_payloads(payloads)
+    app = AppTest.from_file(str(APP), default_timeout=600)
+    page = scenario.split()[0]
+
+    # The landing page is always rendered first, as it is for a real visitor
+    first_run, payload = _timed_run(app.run, payloads)
+    if page != "Home":
+        first_run, payload = _timed_run(lambda: app.sidebar.radio[0].set_value(page).run(), payloads)
+
+    reruns = []
+    if scenario == "EDA year slider":
+        app.toggle[0].set_value(False).run()
+        slider = app.slider[0]
+        years = list(range(int(slider.min), int(slider.max) + 1))
+        for i in range(repeats):
+            year = years[(i + 1) % len(years)]
+            elapsed, payload = _timed_run(lambda: app.slider[0].set_value(year).run(), payloads)
+            reruns.append(elapsed)
+    else:
+        for _ in range(repeats):
+            elapsed, payload = _timed_run(app.run, payloads)
+            reruns.append(elapsed)
+
+    print(json.dumps({
+        'first_run_s': round(first_run, 4),
+        'rerun_s': round(statistics.median(reruns), 4),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'payload_bytes': payload,
+    }))
+
+
+def run_scale(scale, repeats):
+    import synthetic
+
+    start = time.perf_counter()
+    data_dir = synthetic.build(WORK_DIR, scale)
+    generate_s = time.perf_counter() - start
+    env = dict(os.environ, HEALTHCARE_DATA_DIR=str(data_dir), HEALTHCARE_STORE_DIR=str(data_dir / "store"))
+
+    # Build the Parquet store up front so page timings do not include the one-off ingest
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", "import data_store as d; d.ingest('AllRegions.csv'); d.ingest('combined_data.csv')"],
+        cwd=APP_DIR, env=env, check=True,
+    )
+    results = {'ingest_s': round(time.perf_counter() - start, 3), 'generate_s': round(generate_s, 3)}
+
+    for scenario in SCENARIOS:
+        output = subprocess.run(
+            [sys.executable, __file__, "--worker", scenario, "--repeats", str(repeats)],
+            cwd=APP_DIR, env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        results[scenario] = json.loads(output.strip().splitlines()[-1])
+        print(f"scale {scale:>5}x  {scenario:<16} {results[scenario]}", flush=True)
+    return results
+
+
+def compare(results, baseline):
+    """Regression messages for every metric worse than ``baseline`` by more than TOLERANCE."""
+    regressions = []
+    for scale, scenarios in results.items():
+        for scenario, metrics in scenarios.items():
+            if not isinstance(metrics, dict):
+                continue
+            reference = baseline.get(scale, {}).get(scenario, {})
+            for metric, allowed in TOLERANCE.items():
+                if metric in reference and metrics[metric] > reference[metric] * (1 + allowed):
+                    regressions.append(f"scale {scale}x {scenario} {metric}: {reference[metric]} -> {metrics[metric]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", type=Path, help="write the results as JSON to this file")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--worker", metavar="SCENARIO", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.repeats)
+        return
+    if args.compare and not args.save_baseline and not BASELINE.exists():
+        # Timings only compare on the machine that recorded them, so no baseline is shipped
+        parser.error(f"no baseline at {BASELINE}; record one on this machine first with --save-baseline")
+
+    results = {str(scale): run_scale(scale, args.repeats) for scale in args.scales}
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    if args.save_baseline:
+        BASELINE.write_text(json.dumps(results, indent=2))
+    if args.compare:
+        regressions = compare(results, json.loads(BASELINE.read_text()))
+        for regression in regressions:
+            print("REGRESSION", regression)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
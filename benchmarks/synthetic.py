@@ -0,0 +1,70 @@
+"""Synthetic GBD-shaped datasets for benchmarking the app at larger sizes.
+
+Each scale ``s`` replicates the base export ``s`` times under new location
+names, with the values jittered, so the row count grows linearly while the
+schema and the year/sex/age/rei structure stay exactly as in the real data.
+"""
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+APP_DIR = Path(__file__).resolve().parent.parent
+SHAPEFILE = APP_DIR / "MENA.geo.json"
+
+
+def base_regions():
+    return pd.read_csv(APP_DIR / "AllRegions.csv")
+
+
+def base_countries():
+    """combined_data.csv if it is available locally, otherwise a stand-in built from AllRegions.csv.
+
+    The stand-in gives every MENA country from the shapefile the regional
+    MENA rows, scaled by a random per-country factor.
+    """
+    local = APP_DIR / "combined_data.csv"
+    if local.exists():
+        return pd.read_csv(local)
+    regions = base_regions()
+    mena = regions[regions['location'] == 'North Africa and Middle East']
+    names = [feature['properties']['name'] for feature in json.loads(SHAPEFILE.read_text())['features']]
+    rng = np.random.default_rng(0)
+    parts = []
+    for name in names:
+        part = mena.copy()
+        part['location'] = name
+        factor = rng.uniform(0.5, 1.5)
+        part[['val', 'upper', 'lower']] *= factor
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+
+def write_scaled(base, path, scale, seed=0):
+    """Write ``scale`` jittered copies of ``base`` to ``path`` one copy at a time, in bounded memory."""
+    rng = np.random.default_rng(seed)
+    with open(path, 'w', newline='') as out:
+        for copy in range(scale):
+            part = base.copy()
+            if copy:
+                part['location'] = part['location'] + f" #{copy}"
+                noise = rng.lognormal(0.0, 0.1, size=len(part))
+                for column in ('val', 'upper', 'lower'):
+                    part[column] = part[column] * noise
+            part.to_csv(out, index=False, header=copy == 0)
+
+
+def build(directory, scale):
+    """Create (or reuse) the stand-in data directory for ``scale`` and return its path."""
+    directory = Path(directory) / f"scale-{scale}"
+    marker = directory / ".complete"
+    if marker.exists():
+        return directory
+    directory.mkdir(parents=True, exist_ok=True)
+    write_scaled(base_regions(), directory / "AllRegions.csv", scale, seed=scale)
+    write_scaled(base_countries(), directory / "combined_data.csv", scale, seed=scale + 1)
+    shutil.copy(SHAPEFILE, directory / SHAPEFILE.name)
+    marker.touch()
+    return directory
@@ -0,0 +1,156 @@
+import hashlib
+import io
+import os
+import threading
+import types
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+import pandas as pd
+import streamlit as st
+
+from profiling import section
+
+# Upper bound on the rendered images kept in memory, shared by all sessions
+FIGURE_CACHE_MB = float(os.environ.get("HEALTHCARE_FIGURE_CACHE_MB", 64))
+
+# Same output settings st.pyplot uses, so cached charts look identical
+SAVEFIG_KWARGS = {'format': 'png', 'dpi': 200, 'bbox_inches': 'tight'}
+
+# st.image decodes, resizes and re-encodes wider images on every call, so
+# charts are brought down to this width once, before they are cached
+MAX_IMAGE_WIDTH = 1460
+
+
+# pyplot draws on a process-wide current figure, so only one chart is drawn at a time
+_pyplot_lock = threading.Lock()
+
+
+class FigureCache:
+    """Thread-safe LRU of rendered images, evicted by total size in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            image = self._items.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key, image):
+        with self._lock:
+            if key in self._items:
+                self.size -= len(self._items.pop(key))
+            if len(image) > self.max_bytes:
+                return
+            self._items[key] = image
+            self.size += len(image)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def __len__(self):
+        return len(self._items)
+
+
+@st.cache_resource(show_spinner=False)
+def figure_cache():
+    return FigureCache(int(FIGURE_CACHE_MB * 1024 * 1024))
+
+
+def _feed(digest, value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        labels = value.columns if isinstance(value, pd.DataFrame) else value.name
+        digest.update(repr(labels).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _feed(digest, item)
+    elif isinstance(value, dict):
+        for key in sorted(value):
+            digest.update(repr(key).encode())
+            _feed(digest, value[key])
+    else:
+        digest.update(repr(value).encode())
+
+
+def _feed_code(digest, code):
+    # Bytecode alone misses edits to strings, numbers and called names (a new title, colour or plot function)
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode())
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            _feed_code(digest, constant)
+        else:
+            digest.update(repr(constant).encode())
+
+
+def fingerprint(draw, data, params):
+    """Key identifying a chart by its drawing function, input data and parameters."""
+    digest = hashlib.blake2b(digest_size=16)
+    code = draw.__code__
+    digest.update(f"{code.co_filename}:{code.co_firstlineno}:{draw.__qualname__}".encode())
+    _feed_code(digest, code)
+    _feed(digest, data)
+    _feed(digest, params)
+    return digest.hexdigest()
+
+
+def _fit_width(png):
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(png))
+    if image.width <= MAX_IMAGE_WIDTH:
+        return png
+    height = int(image.height * MAX_IMAGE_WIDTH / image.width)
+    buffer = io.BytesIO()
+    image.resize((MAX_IMAGE_WIDTH, height), resample=Image.BILINEAR).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def render_chart(draw, *data, figsize, data_key=None, **params):
+    """PNG bytes of ``draw(*data, **params)`` drawn on a new pyplot figure.
+
+    ``data_key`` stands in for ``data`` in the cache key when hashing the
+    data itself would cost too much, e.g. ``dataset_key(name)`` for a raw
+    dataset; it must change whenever the data does.
+
+    Identical requests are served from the shared figure cache, and the
+    figure is always closed once rendered so none are left behind. Drawing
+    goes through pyplot's global current figure, so sessions take turns
+    under one lock; otherwise one session's chart could land
+    on another's figure and be cached for everyone.
+    """
+    with section('chart', chart=draw.__name__) as info:
+        cache = figure_cache()
+        key = fingerprint(draw, data if data_key is None else data_key, {'figsize': figsize, **params})
+        image = cache.get(key)
+        info['cached'] = image is not None
+        if image is None:
+            with _pyplot_lock:
+                fig = plt.figure(figsize=figsize)
+                try:
+                    draw(*data, **params)
+                    buffer = io.BytesIO()
+                    fig.savefig(buffer, **SAVEFIG_KWARGS)
+                finally:
+                    plt.close(fig)
+            image = _fit_width(buffer.getvalue())
+            cache.put(key, image)
+        info['payload_bytes'] = len(image)
+    return image
+
+
+def show_chart(draw, *data, figsize, data_key=None, **params):
+    """Display a cached matplotlib/seaborn chart in place of ``st.pyplot``."""
+    st.image(render_chart(draw, *data, figsize=figsize, data_key=data_key, **params), use_column_width=True)
@@ -0,0 +1,221 @@
+import copy
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from cube import load_cube
+from data_store import dataset_key
+from profiling import section
+
+# A slice is one combination of these; within a slice the locations are the observations
+SLICE = ['year', 'sex', 'age']
+
+# Cell columns hashed per slice to find the slices that changed between data versions
+HASHED = ['location', 'rei', 'val', 'n']
+
+
+def _slice_stats(values):
+    """Pairwise-complete sums for a (slices x locations x reis) array with NaN for missing values.
+
+    Returns n, sum of x_i, sum of x_i^2 and sum of x_i * x_j over the
+    locations where both rei i and rei j are present, each (slices x reis x reis).
+    """
+    present = (~np.isnan(values)).astype('float64')
+    filled = np.nan_to_num(values)
+    n = np.einsum('sli,slj->sij', present, present)
+    sx = np.einsum('sli,slj->sij', filled, present)
+    sxx = np.einsum('sli,slj->sij', filled ** 2, present)
+    sxy = np.einsum('sli,slj->sij', filled, filled)
+    return n, sx, sxx, sxy
+
+
+def slice_hashes(cells):
+    """Content hash of every slice of cube ``cells``, indexed by SLICE.
+
+    Each cell is hashed with its location and rei and the hashes are summed
+    per slice, so any changed, added or removed cell changes its slice's
+    hash, even when the slice's totals stay the same.
+    """
+    frame = cells.reset_index()
+    rows = pd.util.hash_pandas_object(frame[HASHED], index=False).to_numpy()
+    keys = pd.MultiIndex.from_arrays([frame[column].astype(kind) for column, kind in zip(SLICE, (int, str, str))])
+    codes, slices = keys.factorize()
+    hashes = np.zeros(len(slices), dtype='uint64')
+    # Wraps around modulo 2**64, which keeps the sum independent of the cell order
+    np.add.at(hashes, codes, rows)
+    return pd.Series(hashes, index=slices.set_names(SLICE))
+
+
+class CorrelationStats:
+    """Per-slice sufficient statistics for the correlation between every pair of risk factors.
+
+    For each slice (year x sex x age) and each rei pair it keeps the count,
+    sums, sums of squares and cross-products of the per-location values.
+    A correlation matrix for any sex/age/year filter is the pooled
+    within-slice correlation of the matching slices, combined from these
+    sums without touching the raw data. New slices (e.g. a new GBD year)
+    are added with ``update``, and ``refreshed`` recomputes only the slices
+    of a cube that changed.
+
+    Unfiltered, the matrix is the correlation across locations of each
+    rei's mean value, as the app has always shown it.
+    """
+
+    def __init__(self):
+        self.reis = []
+        self.slices = pd.DataFrame(columns=SLICE)
+        self.n = self.sx = self.sxx = self.sxy = np.zeros((0, 0, 0))
+        self.hashes = pd.Series(dtype='uint64', index=pd.MultiIndex.from_tuples([], names=SLICE))
+        self.overall = None
+
+    @classmethod
+    def from_cube(cls, cube):
+        return cls().refreshed(cube)
+
+    def refreshed(self, cube):
+        """Copy of these statistics brought up to date with ``cube``.
+
+        Slices whose content hash is unchanged are kept as they are; new or
+        changed slices are recomputed from the cube and slices the cube no
+        longer has are dropped. The original is left untouched, so sessions
+        still reading it are not disturbed.
+        """
+        cells = cube.cells
+        current = slice_hashes(cells)
+        changed = current.index[current.to_numpy() != self.hashes.reindex(current.index, fill_value=0).to_numpy()]
+        removed = self.hashes.index.difference(current.index)
+
+        stats = copy.copy(self)
+        stats._drop(removed)
+        if len(changed):
+            keys = pd.MultiIndex.from_arrays([cells.index.get_level_values(column).astype(kind)
+                                              for column, kind in zip(SLICE, (int, str, str))])
+            stats.update(cells[keys.isin(changed)])
+        stats.hashes = current
+        stats.overall = location_correlation(cube)
+        return stats
+
+    def _drop(self, slices):
+        if not len(slices):
+            return
+        keep = ~self.slices.set_index(SLICE).index.isin(slices)
+        self.slices = self.slices[keep].reset_index(drop=True)
+        self.n, self.sx, self.sxx, self.sxy = (a[keep] for a in (self.n, self.sx, self.sxx, self.sxy))
+
+    def _widen(self, reis):
+        new = [rei for rei in reis if rei not in self.reis]
+        if not new:
+            return
+        self.reis = self.reis + new
+        pad = ((0, 0), (0, len(new)), (0, len(new)))
+        self.n, self.sx, self.sxx, self.sxy = (np.pad(a, pad) for a in (self.n, self.sx, self.sxx, self.sxy))
+
+    def update(self, cells):
+        """Add the slices in ``cells`` (a frame or cube cells with SLICE, location, rei, val and n).
+
+        Every slice in ``cells`` must be complete; slices already present are
+        replaced, so feeding the same data twice changes nothing.
+        """
+        cells = cells.reset_index() if isinstance(cells.index, pd.MultiIndex) else cells
+        if 'n' not in cells:
+            cells = cells.assign(n=1)
+        cells = cells.astype({'year': int, 'sex': str, 'age': str, 'location': str, 'rei': str})
+        means = cells.groupby(SLICE + ['location', 'rei'])[['val', 'n']].sum()
+        means = (means['val'] / means['n']).rename('val').reset_index()
+        if means.empty:
+            return
+
+        self._widen(sorted(means['rei'].unique()))
+        slice_keys = means[SLICE].drop_duplicates().reset_index(drop=True)
+        slice_codes = means.groupby(SLICE, sort=False).ngroup().to_numpy()
+        location_codes, _ = pd.factorize(means['location'])
+        rei_codes = pd.Index(self.reis).get_indexer(means['rei'])
+
+        values = np.full((len(slice_keys), location_codes.max() + 1, len(self.reis)), np.nan)
+        values[slice_codes, location_codes, rei_codes] = means['val'].to_numpy()
+        n, sx, sxx, sxy = _slice_stats(values)
+
+        keep = ~self.slices.set_index(SLICE).index.isin(slice_keys.set_index(SLICE).index)
+        self.slices = pd.concat([self.slices[keep], slice_keys], ignore_index=True).astype({'year': int})
+        self.n, self.sx, self.sxx, self.sxy = (
+            np.concatenate([old[keep], new]) for old, new in
+            ((self.n, n), (self.sx, sx), (self.sxx, sxx), (self.sxy, sxy))
+        )
+
+    def _select(self, filters):
+        mask = np.ones(len(self.slices), dtype=bool)
+        for dimension, value in filters.items():
+            if dimension not in SLICE:
+                raise KeyError(f"Unknown slice dimension: {dimension!r}")
+            if value is None:
+                continue
+            column = self.slices[dimension]
+            if isinstance(value, (list, tuple, set)):
+                mask &= column.isin(list(value)).to_numpy()
+            else:
+                mask &= (column == value).to_numpy()
+        return mask
+
+    def matrix(self, min_count=3, **filters):
+        """Rei x rei correlation matrix over the slices matching ``filters`` (dimension=value or list; None for all).
+
+        Pairs observed together fewer than ``min_count`` times are NaN. With
+        no filter this is the correlation of the per-location means when it
+        is known (statistics built from a cube).
+        """
+        if self.overall is not None and all(value is None for value in filters.values()):
+            return self.overall.reindex(index=self.reis, columns=self.reis)
+        mask = self._select(filters)
+        n, sx, sxx, sxy = self.n[mask], self.sx[mask], self.sxx[mask], self.sxy[mask]
+        # The sums for the second rei of each pair are the transposed ones
+        sy, syy = sx.transpose(0, 2, 1), sxx.transpose(0, 2, 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            safe = np.where(n > 0, n, 1)
+            covariance = (sxy - sx * sy / safe).sum(axis=0)
+            variance_x = (sxx - sx ** 2 / safe).sum(axis=0)
+            variance_y = (syy - sy ** 2 / safe).sum(axis=0)
+            correlation = covariance / np.sqrt(variance_x * variance_y)
+        correlation[n.sum(axis=0) < min_count] = np.nan
+        return pd.DataFrame(np.clip(correlation, -1, 1), index=pd.Index(self.reis, name='rei'),
+                            columns=pd.Index(self.reis, name='rei'))
+
+    def top_pairs(self, k=5, **filters):
+        """The ``k`` rei pairs with the strongest correlation (by absolute value) for ``filters``."""
+        matrix = self.matrix(**filters).to_numpy()
+        rows, cols = np.triu_indices(len(self.reis), k=1)
+        values = matrix[rows, cols]
+        valid = ~np.isnan(values)
+        rows, cols, values = rows[valid], cols[valid], values[valid]
+        order = np.argsort(-np.abs(values))[:k]
+        return pd.DataFrame({
+            'risk_factor': [self.reis[i] for i in rows[order]],
+            'other_risk_factor': [self.reis[j] for j in cols[order]],
+            'correlation': values[order],
+        })
+
+
+def location_correlation(cube):
+    """Rei x rei correlation across locations of each rei's mean value, like ``pivot_table(index='location').corr()``."""
+    means = cube.mean('location', 'rei')
+    return means.pivot(index='location', columns='rei', values='val').corr()
+
+
+@st.cache_resource(show_spinner=False)
+def _latest(name):
+    # The statistics of the last data version seen, so the next one only recomputes what changed
+    return {'key': None, 'stats': CorrelationStats(), 'lock': threading.Lock()}
+
+
+def load_correlations(name):
+    """Correlation statistics of ``name``, updated incrementally when the data changes."""
+    key = dataset_key(name)
+    latest = _latest(name)
+    with latest['lock']:
+        if latest['key'] != key:
+            cube = load_cube(name)
+            with section('correlations', dataset=name):
+                latest['stats'] = latest['stats'].refreshed(cube)
+            latest['key'] = key
+        return latest['stats']
@@ -0,0 +1,124 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+
+from data_store import dataset_key, load_gbd
+from profiling import section
+from uncertainty import row_variances
+
+# Dimensions the cube is grouped on, in the order of its sorted index: filters
+# on a leading run of them (e.g. one location/rei/sex/age series) are binary
+# searches, so year comes last
+DIMENSIONS = ['location', 'rei', 'sex', 'age', 'year']
+MEASURES = ['val', 'upper', 'lower']
+
+# Rollups every page reads, built together with the cube
+COMMON_ROLLUPS = [
+    ('year',),
+    ('location',),
+    ('rei',),
+    ('age',),
+    ('year', 'location'),
+    ('location', 'rei'),
+]
+
+# Filtered rollups kept per cube, least recently used dropped first
+MAX_ROLLUPS = 256
+
+
+class Cube:
+    """Rollup cube of a GBD export over year x location x rei x sex x age.
+
+    Each cell holds the sums of ``val``/``upper``/``lower``, the row count
+    ``n`` and the summed interval variances ``var_lower``/``var_upper``, so
+    totals, means and their uncertainty for any coarser grouping can be
+    derived from the cells without going back to the raw rows.
+    """
+
+    def __init__(self, frame, dimensions=DIMENSIONS):
+        self.dimensions = [column for column in dimensions if column in frame.columns]
+        measures = frame[MEASURES].astype('float64')
+        measures['n'] = 1
+        measures['var_lower'], measures['var_upper'] = row_variances(frame)
+        for column in self.dimensions:
+            measures[column] = frame[column]
+        self.cells = measures.groupby(self.dimensions, observed=True).sum().sort_index()
+        self._rollups = OrderedDict()
+        self._lock = threading.Lock()
+        for by in COMMON_ROLLUPS:
+            if set(by) <= set(self.dimensions):
+                self.rollup(*by)
+
+    def _select(self, filters):
+        """Cells matching ``filters``, looked up on the sorted index rather than scanned."""
+        for dimension in filters:
+            if dimension not in self.dimensions:
+                raise KeyError(f"Unknown cube dimension: {dimension!r}")
+        if not filters:
+            return self.cells
+        # One entry per level up to the last filtered one; unfiltered levels take everything
+        last = max(self.dimensions.index(dimension) for dimension in filters)
+        key = []
+        for position, dimension in enumerate(self.dimensions[:last + 1]):
+            if dimension not in filters:
+                key.append(slice(None))
+                continue
+            value = filters[dimension]
+            labels = self.cells.index.levels[position]
+            # .loc raises on labels the cube has never seen, so they are dropped first
+            key.append([v for v in (value if isinstance(value, (list, tuple, set)) else [value]) if v in labels])
+            if not key[-1]:
+                return self.cells.iloc[:0]
+        return self.cells.loc[tuple(key), :]
+
+    def rollup(self, *by, **filters):
+        """Sum the cells matching ``filters`` (dimension=value or list of values) by ``by``.
+
+        Results are memoized per (by, filters), up to MAX_ROLLUPS of them, and
+        must be treated as read-only.
+        """
+        key = (by, tuple(sorted((k, tuple(v) if isinstance(v, (list, tuple, set)) else v)
+                                for k, v in filters.items())))
+        with self._lock:
+            if key in self._rollups:
+                self._rollups.move_to_end(key)
+                return self._rollups[key]
+        with section('rollup', by=','.join(by)):
+            cells = self._select(filters)
+            if by:
+                result = cells.groupby(list(by), observed=True).sum().reset_index()
+            else:
+                result = cells.sum().to_frame().T
+            for column in by:
+                if isinstance(result[column].dtype, pd.CategoricalDtype):
+                    result[column] = result[column].astype(str)
+        with self._lock:
+            self._rollups[key] = result
+            while len(self._rollups) > MAX_ROLLUPS:
+                self._rollups.popitem(last=False)
+        return result
+
+    def total(self, *by, column='val', **filters):
+        """Total of ``column`` by ``by``, like ``df.groupby(by)[column].sum()``."""
+        return self.rollup(*by, **filters)[list(by) + [column]]
+
+    def mean(self, *by, column='val', **filters):
+        """Mean of ``column`` by ``by``, like ``df.groupby(by)[column].mean()``."""
+        result = self.rollup(*by, **filters)
+        means = result[list(by)].copy()
+        means[column] = result[column] / result['n']
+        return means
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _build(name, location, version):
+    frame = load_gbd(name)
+    with section('cube', dataset=name):
+        return Cube(frame)
+
+
+def load_cube(name):
+    """Cube of a GBD export, rebuilt only when the underlying data changes."""
+    return _build(name, *dataset_key(name))
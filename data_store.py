@@ -0,0 +1,115 @@
+import os
+import time
+import urllib.request
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+from profiling import section
+
+# Where the GBD exports live when they are not shipped next to the app
+GITHUB_RAW = "https://raw.githubusercontent.com/hadilfs/Healthcare/main/"
+
+APP_DIR = Path(__file__).resolve().parent
+DATA_DIR = Path(os.environ.get("HEALTHCARE_DATA_DIR", APP_DIR))
+STORE_DIR = Path(os.environ.get("HEALTHCARE_STORE_DIR", APP_DIR / ".store"))
+
+# Remote sources are re-checked at most once per this many seconds
+REMOTE_TTL = 3600
+
+# Typed schema of the GBD results exports
+CATEGORICAL_COLUMNS = ['measure', 'location', 'sex', 'age', 'cause', 'rei', 'metric']
+GBD_DTYPES = {
+    **{column: 'category' for column in CATEGORICAL_COLUMNS},
+    'year': 'int16',
+    'val': 'float32',
+    'upper': 'float32',
+    'lower': 'float32',
+}
+
+
+def source_location(name):
+    """Return the local path of ``name`` if it is in the data directory, else its GitHub URL."""
+    local = DATA_DIR / name
+    if local.exists():
+        return str(local)
+    return GITHUB_RAW + name
+
+
+def read_source(location):
+    if location.startswith(("http://", "https://")):
+        with urllib.request.urlopen(location) as response:
+            return response.read()
+    return Path(location).read_bytes()
+
+
+def source_version(location):
+    """Cheap token that changes whenever ``location`` may have new contents."""
+    if location.startswith(("http://", "https://")):
+        return int(time.time() // REMOTE_TTL)
+    stat = os.stat(location)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def dataset_dir(name):
+    """Store directory holding the Parquet parts and manifest of ``name``."""
+    return STORE_DIR / Path(name).stem
+
+
+def ingest(name, location=None):
+    """Stream the current contents of a GBD export into the store for ``name``.
+
+    Returns the dataset directory. An unchanged source is recognised by its
+    hash and never parsed twice, so exports appended with ``ingest.py`` are
+    kept; a changed one rebuilds the dataset from scratch, so revised values
+    never hide behind the stale rows of the same years.
+    """
+    from ingest import ingest_export
+    ingest_export(location or source_location(name), name, replace_if_new=True)
+    return dataset_dir(name)
+
+
+def store_version(name):
+    """Token that changes whenever the stored parts of ``name`` change, including ingests run outside the app."""
+    manifest = dataset_dir(name) / "_manifest.json"
+    return manifest.stat().st_mtime_ns if manifest.exists() else None
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _ingest(name, location, version):
+    with section('ingest', dataset=name):
+        return ingest(name, location)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _load(name, location, version):
+    directory = dataset_dir(name)
+    if not any(directory.glob("part-*.parquet")):
+        return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in GBD_DTYPES.items()})
+    with section('read parquet', dataset=name) as info:
+        frame = pd.read_parquet(directory, read_dictionary=CATEGORICAL_COLUMNS)
+        # Dictionaries come back in arrival order; sort them as read_csv's categories were
+        for column in CATEGORICAL_COLUMNS:
+            if column in frame.columns:
+                values = frame[column].cat.remove_unused_categories()
+                frame[column] = values.cat.reorder_categories(sorted(values.cat.categories))
+        info['rows'] = len(frame)
+    return frame
+
+
+def dataset_key(name):
+    """Cache key identifying the current version of ``name``."""
+    location = source_location(name)
+    version = source_version(location)
+    _ingest(name, location, version)
+    return location, (version, store_version(name))
+
+
+def load_gbd(name):
+    """Load a GBD export as a typed DataFrame shared by every session.
+
+    The frame is cached across reruns and sessions, so callers must treat it
+    as read-only.
+    """
+    return _load(name, *dataset_key(name))
@@ -0,0 +1,132 @@
+from statistics import NormalDist
+
+import numpy as np
+import streamlit as st
+
+from cube import load_cube
+from data_store import dataset_key
+from profiling import section
+
+# Dimensions identifying one forecast series
+SERIES = ['location', 'rei', 'sex', 'age']
+
+# Smoothing parameters tried for every series; the pair with the lowest
+# one-step-ahead squared error is kept
+ALPHAS = np.linspace(0.1, 0.9, 9)
+BETAS = np.linspace(0.05, 0.5, 10)
+
+# Series fitted together per NumPy batch, bounding peak memory on large exports
+BATCH = 20000
+
+
+def series_matrix(cube, by=SERIES, column='val'):
+    """Series x year matrix of ``column`` totals from ``cube``, one row per combination of ``by``.
+
+    With no ``by`` the matrix has a single ``Total`` row.
+    """
+    totals = cube.total('year', *by, column=column)
+    if by:
+        matrix = totals.pivot_table(index=list(by), columns='year', values=column, aggfunc='sum', observed=True)
+    else:
+        matrix = totals.set_index('year')[column].rename('Total').to_frame().T
+        matrix.index.name = 'series'
+    matrix = matrix.sort_index(axis=1).interpolate(axis=1, limit_direction='both')
+    return matrix.dropna()
+
+
+def _fit_batch(values):
+    """Holt's linear trend method fitted to every row of ``values`` at once.
+
+    Returns the final level and trend, the chosen alpha and beta and the
+    standard deviation of the one-step-ahead errors, one entry per row.
+    With a single year there is no trend or error to fit, so the forecast
+    stays flat at that year's value and has no interval (NaN parameters).
+    """
+    if values.shape[1] < 2:
+        unknown = np.full(len(values), np.nan)
+        return values[:, -1], np.zeros(len(values)), unknown, unknown, unknown
+    alpha = np.repeat(ALPHAS, len(BETAS))[:, None]
+    beta = np.tile(BETAS, len(ALPHAS))[:, None]
+    level = np.broadcast_to(values[:, 0], (len(alpha), len(values))).copy()
+    trend = np.broadcast_to(values[:, 1] - values[:, 0], level.shape).copy()
+    sse = np.zeros(level.shape)
+    for t in range(1, values.shape[1]):
+        error = values[:, t] - (level + trend)
+        sse += error ** 2
+        level = level + trend + alpha * error
+        trend = trend + alpha * beta * error
+
+    best = sse.argmin(axis=0)
+    rows = np.arange(len(values))
+    # The first error is zero by construction of the initial trend
+    dof = max(values.shape[1] - 2, 1)
+    return (level[best, rows], trend[best, rows], alpha[best, 0], beta[best, 0],
+            np.sqrt(sse[best, rows] / dof))
+
+
+class Forecaster:
+    """Batched Holt's linear trend forecasts with prediction intervals for every row of a series matrix."""
+
+    def __init__(self, matrix):
+        self.index = matrix.index
+        self.last_year = int(matrix.columns[-1])
+        values = matrix.to_numpy(dtype='float64')
+        parts = [_fit_batch(values[start:start + BATCH]) for start in range(0, len(values), BATCH)]
+        if parts:
+            self.level, self.trend, self.alpha, self.beta, self.sigma = (np.concatenate(p) for p in zip(*parts))
+        else:
+            self.level = self.trend = self.alpha = self.beta = self.sigma = np.empty(0)
+
+    def __len__(self):
+        return len(self.index)
+
+    def forecast(self, horizon, level=0.95, **filters):
+        """Forecasts for the next ``horizon`` years of the series matching ``filters``.
+
+        Returns a long frame with the series columns, ``year``, the point
+        forecast ``val`` and the ``lower``/``upper`` bounds of the
+        ``level`` prediction interval, all clipped at zero so that
+        ``lower <= val <= upper`` holds for a series trending below zero.
+        """
+        mask = np.ones(len(self.index), dtype=bool)
+        for dimension, value in filters.items():
+            mask &= self.index.get_level_values(dimension) == value
+        steps = np.arange(1, horizon + 1)
+
+        point = self.level[mask, None] + self.trend[mask, None] * steps
+        # ETS(A,A,N) forecast variance: sigma^2 * (1 + sum_{j<h} alpha^2 (1 + j beta)^2)
+        weights = (self.alpha[mask, None] * (1 + steps[:-1] * self.beta[mask, None])) ** 2
+        variance = self.sigma[mask, None] ** 2 * (1 + np.concatenate([np.zeros((mask.sum(), 1)), np.cumsum(weights, axis=1)], axis=1))
+        spread = NormalDist().inv_cdf(0.5 + level / 2) * np.sqrt(variance)
+
+        index = self.index[mask]
+        result = index.repeat(horizon).to_frame(index=False)
+        result['year'] = np.tile(self.last_year + steps, len(index))
+        result['val'] = np.clip(point, 0, None).ravel()
+        result['lower'] = np.clip(point - spread, 0, None).ravel()
+        result['upper'] = np.clip(point + spread, 0, None).ravel()
+        return result
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _fit(name, location, version):
+    cube = load_cube(name)
+    with section('forecast fit', dataset=name):
+        return Forecaster(series_matrix(cube))
+
+
+def load_forecaster(name):
+    """Forecaster fitted to every location x rei x sex x age series of ``name``, refitted only when the data changes."""
+    return _fit(name, *dataset_key(name))
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _fit_total(name, location, version):
+    cube = load_cube(name)
+    with section('forecast fit', dataset=name, series='Total'):
+        return Forecaster(series_matrix(cube, by=[]))
+
+
+def load_total_forecaster(name):
+    """Forecaster for the yearly total of ``name`` across every series."""
+    return _fit_total(name, *dataset_key(name))
@@ -0,0 +1,87 @@
+import json
+
+import numpy as np
+import shapely
+import streamlit as st
+
+from data_store import read_source, source_location, source_version
+from profiling import section
+
+SHAPEFILE = "MENA.geo.json"
+
+# Simplification tolerance (degrees) and coordinate precision (decimals) of the
+# shapes sent to the browser: about a pixel at the zoom the maps open at
+TOLERANCE = 0.1
+DECIMALS = 2
+
+
+def _simplify(geometries, tolerance):
+    if tolerance <= 0:
+        return geometries
+    if hasattr(shapely, 'coverage_simplify'):
+        # Simplifies shared borders once, so neighbouring countries keep meeting exactly
+        return shapely.coverage_simplify(geometries, tolerance)
+    return shapely.simplify(geometries, tolerance, preserve_topology=True)
+
+
+def _quantize(geometries, decimals):
+    return shapely.transform(geometries, lambda coords: np.round(coords, decimals))
+
+
+def _repair(geometries):
+    """Valid polygonal versions of ``geometries``."""
+    geometries = shapely.make_valid(geometries)
+    # make_valid keeps collapsed rings as stray lines, which a choropleth cannot draw
+    for position, shape in enumerate(geometries):
+        if shape.geom_type == 'GeometryCollection':
+            geometries[position] = shapely.union_all(
+                [part for part in shape.geoms if part.geom_type in ('Polygon', 'MultiPolygon')])
+    return geometries
+
+
+def build_shapes(raw, tolerance=TOLERANCE, decimals=DECIMALS):
+    """Simplified, quantized GeoJSON FeatureCollection of ``raw``.
+
+    Only the ``name`` property is kept, since it is all the map joins on.
+    """
+    features = json.loads(raw)['features']
+    names = [feature['properties']['name'] for feature in features]
+    geometries = shapely.from_geojson([json.dumps(feature['geometry']) for feature in features])
+    geometries = _repair(geometries)
+
+    # Rounding can fold a simplified ring onto itself, so the shapes are repaired once more
+    shapes = _repair(_quantize(_simplify(geometries, tolerance), decimals))
+    return {
+        'type': 'FeatureCollection',
+        'features': [
+            {'type': 'Feature', 'properties': {'name': name}, 'geometry': json.loads(shapely.to_geojson(shape))}
+            for name, shape in zip(names, shapes)
+        ],
+    }
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _shapes(location, version):
+    with section('shapes', source=location):
+        return build_shapes(read_source(location))
+
+
+def load_shapes(name=SHAPEFILE):
+    """Simplified GeoJSON of ``name``, shared by every session.
+
+    The returned dict must not be modified; use ``with_values`` to attach
+    data to it.
+    """
+    location = source_location(name)
+    return _shapes(location, source_version(location))
+
+
+def with_values(shapes, values, field):
+    """Copy of ``shapes`` with ``values[name]`` (or None) stored as property ``field``."""
+    return {
+        'type': 'FeatureCollection',
+        'features': [
+            {**feature, 'properties': {**feature['properties'], field: values.get(feature['properties']['name'])}}
+            for feature in shapes['features']
+        ],
+    }
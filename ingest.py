@@ -0,0 +1,177 @@
+"""Streaming ingestion of GBD results exports into the local Parquet store.
+
+Exports are read in fixed-size chunks, straight out of ZIP archives where
+needed, so memory use stays bounded however large the export is. Rows are
+filtered while streaming (``val > 0`` and optional cause/metric/measure
+filters). Only (year, location) combinations the store does not have yet
+are appended, so re-ingesting the same export changes nothing and a
+refresh only pays for the new years or locations.
+
+    python ingest.py IHME-GBD_2021_DATA.zip --name combined_data.csv --cause "Diabetes mellitus type 2" --metric Percent
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import urllib.request
+import uuid
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+from data_store import CATEGORICAL_COLUMNS, GBD_DTYPES, dataset_dir
+
+CHUNK_ROWS = 500_000
+MANIFEST = "_manifest.json"
+
+# Exports downloaded with IDs and names use *_name columns; the app uses the bare names
+NAME_COLUMNS = {f"{column}_name": column for column in CATEGORICAL_COLUMNS}
+
+
+def read_manifest(directory):
+    """Ingested (year, location) keys and source digests of a dataset directory."""
+    path = Path(directory) / MANIFEST
+    if not path.exists():
+        return {'keys': [], 'sources': []}
+    return json.loads(path.read_text())
+
+
+def _write_manifest(directory, manifest):
+    path = Path(directory) / MANIFEST
+    partial = path.with_suffix('.tmp')
+    partial.write_text(json.dumps(manifest))
+    os.replace(partial, path)
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+@contextmanager
+def local_copy(location):
+    """Path of ``location`` on disk, downloading it to a temporary file first if it is a URL."""
+    if not str(location).startswith(("http://", "https://")):
+        yield Path(location)
+        return
+    with tempfile.NamedTemporaryFile(suffix=Path(str(location)).suffix, delete=False) as target:
+        with urllib.request.urlopen(location) as response:
+            shutil.copyfileobj(response, target)
+    try:
+        yield Path(target.name)
+    finally:
+        os.unlink(target.name)
+
+
+def iter_chunks(path, chunk_rows=CHUNK_ROWS):
+    """DataFrame chunks of a GBD CSV, or of every CSV inside a ZIP export, with the app's column names."""
+    path = Path(path)
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                if member.lower().endswith('.csv'):
+                    with archive.open(member) as source:
+                        yield from iter_chunks_from(source, chunk_rows)
+    else:
+        with open(path, 'rb') as source:
+            yield from iter_chunks_from(source, chunk_rows)
+
+
+def iter_chunks_from(source, chunk_rows):
+    wanted = set(GBD_DTYPES) | set(NAME_COLUMNS)
+    reader = pd.read_csv(source, chunksize=chunk_rows, usecols=lambda column: column in wanted)
+    for chunk in reader:
+        chunk = chunk.rename(columns=NAME_COLUMNS)
+        yield chunk[[column for column in GBD_DTYPES if column in chunk.columns]]
+
+
+def filter_chunk(chunk, causes=None, metrics=None, measures=None):
+    """Rows of ``chunk`` the app uses: positive values, optionally only the given causes/metrics/measures."""
+    keep = chunk['val'] > 0
+    for column, allowed in (('cause', causes), ('metric', metrics), ('measure', measures)):
+        if allowed:
+            keep &= chunk[column].isin(allowed)
+    return chunk[keep]
+
+
+def ingest_export(location, name, causes=None, metrics=None, measures=None, chunk_rows=CHUNK_ROWS, replace=False,
+                  replace_if_new=False):
+    """Append the rows of an export for (year, location) pairs not yet in the store for ``name``.
+
+    Returns the number of rows written. Exports already ingested (by
+    content digest) are skipped without being read. With ``replace`` the
+    dataset is rebuilt from this export alone, unless it already holds
+    exactly this export. With ``replace_if_new`` an export not seen before
+    rebuilds the dataset and one already ingested is left alone, which is
+    how the app keeps the store in step with a source file that was edited.
+    """
+    directory = dataset_dir(name)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    with local_copy(location) as path:
+        digest = file_digest(path)
+        manifest = read_manifest(directory)
+        if digest in manifest['sources'] and not (replace and manifest['sources'] != [digest]):
+            return 0
+        rebuild = replace or replace_if_new
+        if rebuild:
+            manifest = {'keys': [], 'sources': []}
+
+        known = pd.MultiIndex.from_tuples([tuple(key) for key in manifest['keys']], names=['year', 'location'])
+        staging = directory / f"_staging-{uuid.uuid4().hex}"
+        staging.mkdir()
+        written, new_keys = 0, set()
+        try:
+            for number, chunk in enumerate(iter_chunks(path, chunk_rows)):
+                chunk = filter_chunk(chunk, causes, metrics, measures)
+                keys = pd.MultiIndex.from_arrays([chunk['year'].astype(int), chunk['location'].astype(str)])
+                chunk = chunk[~keys.isin(known)]
+                if chunk.empty:
+                    continue
+                chunk = chunk.astype({column: dtype for column, dtype in GBD_DTYPES.items()
+                                      if column in chunk.columns and dtype != 'category'})
+                # Parts are numbered by ingest so the stored rows keep their arrival order
+                chunk.to_parquet(staging / f"part-{len(manifest['sources']):04d}-{number:05d}.parquet", index=False)
+                new_keys.update(zip(chunk['year'].astype(int), chunk['location'].astype(str)))
+                written += len(chunk)
+
+            # Publish the new parts and only then record them, so an interrupted run leaves no trace
+            if rebuild:
+                for old in directory.glob("part-*.parquet"):
+                    old.unlink()
+            for part in staging.iterdir():
+                os.replace(part, directory / part.name)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        manifest['keys'] = sorted({tuple(key) for key in manifest['keys']} | new_keys)
+        manifest['sources'].append(digest)
+        _write_manifest(directory, manifest)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("export", help="GBD results export (CSV or ZIP), local path or URL")
+    parser.add_argument("--name", required=True, help="dataset to update, e.g. combined_data.csv")
+    parser.add_argument("--cause", action="append", help="keep only this cause (repeatable)")
+    parser.add_argument("--metric", action="append", help="keep only this metric (repeatable)")
+    parser.add_argument("--measure", action="append", help="keep only this measure (repeatable)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--replace", action="store_true", help="rebuild the dataset from this export alone")
+    args = parser.parse_args()
+
+    written = ingest_export(args.export, args.name, args.cause, args.metric, args.measure,
+                            chunk_rows=args.chunk_rows, replace=args.replace)
+    print(f"{args.name}: {written} new rows")
+
+
+if __name__ == "__main__":
+    main()
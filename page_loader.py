@@ -0,0 +1,84 @@
+import importlib
+import threading
+import time
+
+from profiling import get_logger, section
+
+logger = get_logger(__name__)
+
+
+def _gbd(name):
+    from data_store import load_gbd
+    return load_gbd(name)
+
+
+def _cube(name):
+    from cube import load_cube
+    return load_cube(name)
+
+
+# Datasets a page can ask for, loaded on first use and cached by their own modules
+DATASETS = {
+    'df1': lambda: _gbd("AllRegions.csv"),
+    'cube': lambda: _cube("combined_data.csv"),
+    'cube1': lambda: _cube("AllRegions.csv"),
+}
+
+PLOTTING = ['matplotlib.pyplot', 'seaborn', 'plotly.express', 'charts']
+
+# What each page needs before it can draw; anything not listed is never imported for it
+PAGES = {
+    "Home": {'libraries': [], 'datasets': []},
+    "EDA": {
+        'libraries': PLOTTING + ['correlation', 'folium', 'branca.colormap', 'streamlit_folium', 'geometry', 'time_map', 'trends'],
+        'datasets': ['df1', 'cube', 'cube1'],
+    },
+    "Dashboard": {'libraries': PLOTTING + ['correlation'], 'datasets': ['cube', 'cube1']},
+    "Conclusion": {'libraries': ['matplotlib.pyplot', 'charts', 'forecast'], 'datasets': ['cube', 'cube1']},
+}
+
+_PROCESS_START = time.perf_counter()
+_first_loads = {}
+_lock = threading.Lock()
+
+
+def _timed(kind, name, load):
+    start = time.perf_counter()
+    with section(f"{kind} {name}"):
+        result = load()
+    elapsed = time.perf_counter() - start
+    with _lock:
+        if (kind, name) not in _first_loads:
+            _first_loads[(kind, name)] = elapsed
+            logger.info("first %s load: %s took %.3fs", kind, name, elapsed)
+    return result
+
+
+def load_page(page):
+    """Import the libraries and load the datasets ``page`` declares, returning the datasets by name.
+
+    Modules stay in ``sys.modules`` and datasets in their caches afterwards,
+    so only the first visit to a page pays for them.
+    """
+    needs = PAGES[page]
+    start = time.perf_counter()
+    for module in needs['libraries']:
+        _timed('library', module, lambda: importlib.import_module(module))
+    datasets = {name: _timed('dataset', name, DATASETS[name]) for name in needs['datasets']}
+    with _lock:
+        if ('page', page) not in _first_loads:
+            _first_loads[('page', page)] = time.perf_counter() - start
+            _first_loads[('ready', page)] = time.perf_counter() - _PROCESS_START
+    return datasets
+
+
+def startup_report():
+    """First-load timings as (kind, name, seconds) rows, slowest first within each kind.
+
+    ``ready`` rows are measured from process start to the first time that
+    page had everything it needs.
+    """
+    order = {'ready': 0, 'page': 1, 'library': 2, 'dataset': 3}
+    with _lock:
+        rows = [(kind, name, seconds) for (kind, name), seconds in _first_loads.items()]
+    return sorted(rows, key=lambda row: (order[row[0]], -row[2]))
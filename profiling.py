@@ -0,0 +1,169 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+
+# Level of the app's own loggers; Streamlit only configures its own, so they get a handler here
+LOG_LEVEL = os.environ.get("HEALTHCARE_LOG_LEVEL", "INFO").upper()
+
+
+def get_logger(name, format="%(asctime)s %(name)s %(levelname)s %(message)s"):
+    """Logger for one of the app's modules, writing to stderr at LOG_LEVEL."""
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(format))
+        logger.addHandler(handler)
+        logger.setLevel(LOG_LEVEL)
+        logger.propagate = False
+    return logger
+
+
+# One JSON object per line, so the rerun logs can be parsed as they are
+logger = get_logger(__name__, format="%(message)s")
+
+# The performance panel is opt-in: set HEALTHCARE_DEBUG=1 or open the app with ?debug=1
+DEBUG = os.environ.get("HEALTHCARE_DEBUG", "") not in ("", "0")
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+PROFILERS = ["Off", "cProfile"] + (["pyinstrument"] if pyinstrument else [])
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_local = threading.local()
+
+
+def rss_mb():
+    """Current resident memory of the process in MB, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE / 2 ** 20
+    except OSError:
+        return None
+
+
+class Run:
+    """Timed sections, memory and an optional profile of one script rerun."""
+
+    def __init__(self, page, profiler="Off"):
+        self.page = page
+        self.start = time.perf_counter()
+        self.rss = rss_mb()
+        self.sections = []
+        self.depth = 0
+        self.seconds = None
+        self.profile = None
+        self.profiler = None
+        if profiler == "cProfile":
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        elif profiler == "pyinstrument" and pyinstrument:
+            self.profiler = pyinstrument.Profiler()
+            self.profiler.start()
+
+    def stop_profiler(self):
+        if isinstance(self.profiler, cProfile.Profile):
+            self.profiler.disable()
+            output = io.StringIO()
+            pstats.Stats(self.profiler, stream=output).sort_stats("cumulative").print_stats(30)
+            self.profile = output.getvalue()
+        elif self.profiler is not None:
+            self.profiler.stop()
+            self.profile = self.profiler.output_text(unicode=False, color=False)
+        self.profiler = None
+
+    def table(self):
+        """Sections in the order they started, nested ones indented under their parent."""
+        import pandas as pd
+
+        rows = sorted(self.sections, key=lambda row: row['start_s'])
+        return pd.DataFrame([
+            {**row, 'section': "  " * row['depth'] + row['section']} for row in rows
+        ]).drop(columns=['depth'], errors='ignore')
+
+
+def _delta(before, after):
+    return None if before is None or after is None else round(after - before, 1)
+
+
+@contextmanager
+def section(name, **fields):
+    """Time the enclosed block as part of the current rerun.
+
+    Yields a dict of extra fields to record with the section (e.g.
+    ``payload_bytes``). Outside a rerun started with ``start_run`` this
+    does nothing beyond yielding the dict.
+    """
+    run = getattr(_local, 'run', None)
+    if run is None:
+        yield fields
+        return
+    start, rss = time.perf_counter(), rss_mb()
+    depth, run.depth = run.depth, run.depth + 1
+    try:
+        yield fields
+    finally:
+        run.depth = depth
+        run.sections.append({
+            'section': name,
+            'depth': depth,
+            'start_s': round(start - run.start, 4),
+            'seconds': round(time.perf_counter() - start, 4),
+            'memory_mb': _delta(rss, rss_mb()),
+            **fields,
+        })
+
+
+def start_run(page, profiler="Off"):
+    """Begin recording a rerun of ``page``, optionally under ``profiler`` (one of PROFILERS)."""
+    previous = getattr(_local, 'run', None)
+    if previous is not None:
+        # The last rerun was interrupted (st.stop, an exception or a new rerun) before finish_run
+        previous.stop_profiler()
+    _local.run = Run(page, profiler)
+    return _local.run
+
+
+def finish_run():
+    """Stop recording, log the rerun as one JSON line and return it."""
+    run = getattr(_local, 'run', None)
+    if run is None:
+        return None
+    _local.run = None
+    run.stop_profiler()
+    run.seconds = time.perf_counter() - run.start
+    logger.info(json.dumps({
+        'event': 'rerun',
+        'page': run.page,
+        'seconds': round(run.seconds, 4),
+        'memory_mb': _delta(run.rss, rss_mb()),
+        'sections': run.sections,
+    }, default=str))
+    return run
+
+
+def debug_enabled():
+    return DEBUG or st.query_params.get("debug") == "1"
+
+
+def debug_panel(run):
+    """Sidebar panel with the sections of ``run`` and its profile, plus the profiler choice for the next rerun."""
+    with st.sidebar.expander("Performance", expanded=True):
+        memory = _delta(run.rss, rss_mb())
+        st.markdown(f"**{run.page}** rerun: {run.seconds:.3f}s" + (f", memory {memory:+.1f} MB" if memory is not None else ""))
+        if run.sections:
+            st.dataframe(run.table(), hide_index=True)
+        st.selectbox("Profile each rerun with", PROFILERS, key="profiler")
+        if run.profile:
+            st.code(run.profile, language=None)
+            st.download_button("Download profile", run.profile, file_name=f"profile-{run.page}.txt")
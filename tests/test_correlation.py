@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from correlation import CorrelationStats
+from cube import Cube
+
+LOCATIONS = ['Egypt', 'Jordan', 'Lebanon', 'Morocco', 'Oman', 'Qatar', 'Tunisia']
+REIS = ['High body-mass index', 'High fasting plasma glucose', 'Smoking']
+
+
+@pytest.fixture
+def rows():
+    index = pd.MultiIndex.from_product([[2019, 2020, 2021], ['Female', 'Male'], ['15-49 years', '50-74 years'],
+                                        LOCATIONS, REIS], names=['year', 'sex', 'age', 'location', 'rei'])
+    val = np.random.default_rng(0).uniform(0.01, 1, len(index))
+    return index.to_frame(index=False).assign(val=val, upper=val * 1.2, lower=val * 0.8)
+
+
+def expected(rows, **filters):
+    for column, value in filters.items():
+        rows = rows[rows[column] == value]
+    return rows.pivot_table(index='location', columns='rei', values='val').corr()
+
+
+def assert_matches(actual, expected):
+    pd.testing.assert_frame_equal(actual.rename_axis(index=None, columns=None),
+                                  expected.rename_axis(index=None, columns=None), check_exact=False)
+
+
+def test_unfiltered_matrix_is_the_correlation_of_location_means(rows):
+    stats = CorrelationStats.from_cube(Cube(rows))
+
+    assert_matches(stats.matrix(), expected(rows))
+
+
+def test_one_slice_is_the_correlation_across_its_locations(rows):
+    stats = CorrelationStats.from_cube(Cube(rows))
+
+    assert_matches(stats.matrix(year=2020, sex='Male', age='50-74 years'),
+                   expected(rows, year=2020, sex='Male', age='50-74 years'))
+
+
+def test_update_in_parts_matches_update_at_once(rows):
+    whole = CorrelationStats()
+    whole.update(rows)
+    parts = CorrelationStats()
+    parts.update(rows[rows['year'] < 2021])
+    parts.update(rows[rows['year'] == 2021])
+    parts.update(rows[rows['year'] == 2021])
+
+    assert_matches(parts.matrix(), whole.matrix())
+    assert_matches(parts.matrix(year=2021, sex='Female', age='15-49 years'),
+                   expected(rows, year=2021, sex='Female', age='15-49 years'))
+
+
+def test_refreshed_recomputes_slices_whose_totals_did_not_change(rows):
+    stats = CorrelationStats.from_cube(Cube(rows))
+    # Swap two locations' values of one rei within one slice: its sums stay the same, its correlation does not
+    swapped = rows.copy()
+    one_rei = ((swapped['year'] == 2020) & (swapped['sex'] == 'Male') & (swapped['age'] == '50-74 years')
+               & (swapped['rei'] == 'Smoking'))
+    swapped.loc[one_rei, 'location'] = swapped.loc[one_rei, 'location'].replace({'Egypt': 'Jordan', 'Jordan': 'Egypt'})
+
+    refreshed = stats.refreshed(Cube(swapped))
+
+    assert_matches(refreshed.matrix(year=2020, sex='Male', age='50-74 years'),
+                   expected(swapped, year=2020, sex='Male', age='50-74 years'))
+    assert_matches(refreshed.matrix(), expected(swapped))
+    # The original statistics are left as they were
+    assert_matches(stats.matrix(year=2020, sex='Male', age='50-74 years'),
+                   expected(rows, year=2020, sex='Male', age='50-74 years'))
+
+
+def test_refreshed_drops_removed_slices(rows):
+    stats = CorrelationStats.from_cube(Cube(rows))
+    kept = rows[rows['year'] < 2021]
+
+    refreshed = stats.refreshed(Cube(kept))
+
+    assert sorted(refreshed.slices['year'].unique()) == [2019, 2020]
+    fresh = CorrelationStats.from_cube(Cube(kept))
+    assert_matches(refreshed.matrix(sex='Female'), fresh.matrix(sex='Female'))
@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+
+from forecast import Forecaster
+
+
+def test_forecasts_of_a_declining_series_stay_ordered_and_non_negative():
+    years = range(2000, 2010)
+    matrix = pd.DataFrame([np.linspace(1.0, 0.1, 10), np.linspace(0.1, 1.0, 10)], columns=years,
+                          index=pd.Index(['Falling', 'Rising'], name='location'))
+
+    forecast = Forecaster(matrix).forecast(10)
+
+    assert (forecast[['lower', 'val', 'upper']] >= 0).all().all()
+    assert (forecast['lower'] <= forecast['val']).all()
+    assert (forecast['val'] <= forecast['upper']).all()
+    assert forecast['year'].max() == 2019
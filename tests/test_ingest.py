@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+import data_store
+from ingest import ingest_export, read_manifest
+
+ROWS = pd.DataFrame({
+    'measure': 'Deaths', 'location': ['Egypt', 'Egypt', 'Jordan', 'Jordan'], 'sex': 'Both', 'age': 'All ages',
+    'cause': 'Diabetes mellitus type 2', 'rei': 'High body-mass index', 'metric': 'Percent',
+    'year': [2020, 2021, 2020, 2021], 'val': [0.1, 0.2, 0.3, 0.0], 'upper': 0.5, 'lower': 0.05,
+})
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_store, 'STORE_DIR', tmp_path / 'store')
+    return tmp_path
+
+
+def stored(name):
+    return pd.read_parquet(data_store.dataset_dir(name))
+
+
+def test_unchanged_source_is_not_reingested(store):
+    source = store / 'export.csv'
+    ROWS.to_csv(source, index=False)
+    data_store.ingest('export.csv', str(source))
+    parts = sorted(data_store.dataset_dir('export.csv').glob('part-*.parquet'))
+    manifest = read_manifest(data_store.dataset_dir('export.csv'))
+
+    data_store.ingest('export.csv', str(source))
+
+    assert sorted(data_store.dataset_dir('export.csv').glob('part-*.parquet')) == parts
+    assert read_manifest(data_store.dataset_dir('export.csv')) == manifest
+    # val > 0 is applied while streaming
+    assert len(stored('export.csv')) == 3
+
+
+def test_revised_values_replace_the_stored_ones(store):
+    source = store / 'export.csv'
+    ROWS.to_csv(source, index=False)
+    data_store.ingest('export.csv', str(source))
+
+    ROWS.assign(val=ROWS['val'] * 2).to_csv(source, index=False)
+    data_store.ingest('export.csv', str(source))
+
+    assert stored('export.csv')['val'].sum() == pytest.approx(ROWS['val'].sum() * 2)
+
+
+def test_exports_append_only_new_years_and_locations(store):
+    first, second = store / 'first.csv', store / 'second.csv'
+    ROWS[ROWS['year'] == 2020].to_csv(first, index=False)
+    ROWS.assign(val=ROWS['val'] + 1).to_csv(second, index=False)
+
+    assert ingest_export(first, 'export.csv') == 2
+    assert ingest_export(second, 'export.csv') == 2
+    assert ingest_export(second, 'export.csv') == 0
+    assert sorted(stored('export.csv')['year']) == [2020, 2020, 2021, 2021]
+
+
+def test_categories_load_sorted(store, monkeypatch):
+    monkeypatch.setattr(data_store, 'DATA_DIR', store)
+    ROWS.iloc[::-1].to_csv(store / 'export.csv', index=False)
+
+    frame = data_store.load_gbd('export.csv')
+
+    assert list(frame['location'].cat.categories) == ['Egypt', 'Jordan']
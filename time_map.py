@@ -0,0 +1,130 @@
+import folium
+from branca.colormap import linear
+from branca.element import MacroElement
+from jinja2 import Template
+
+from geometry import with_values
+
+
+class YearAnimation(MacroElement):
+    """Year slider and play button that recolor their parent GeoJson layer in the browser.
+
+    ``values`` and ``colors`` map each feature name to one entry per year, so
+    moving between years never goes back to the server.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var layer = {{ this._parent.get_name() }};
+            var years = {{ this.years|tojson }};
+            var values = {{ this.values|tojson }};
+            var colors = {{ this.colors|tojson }};
+            var field = {{ this.field|tojson }};
+            var timer = null;
+
+            var control = L.control({position: 'bottomleft'});
+            control.onAdd = function() {
+                var div = L.DomUtil.create('div', 'leaflet-bar');
+                div.style.background = 'white';
+                div.style.padding = '4px 8px';
+                div.innerHTML = '<button type="button" style="width:2em">&#9654;</button> '
+                    + '<input type="range" min="0" max="' + (years.length - 1) + '" step="1" style="vertical-align:middle"> '
+                    + '<b></b>';
+                L.DomEvent.disableClickPropagation(div);
+                L.DomEvent.disableScrollPropagation(div);
+                return div;
+            };
+            control.addTo({{ this._parent._parent.get_name() }});
+
+            var container = control.getContainer();
+            var button = container.querySelector('button');
+            var slider = container.querySelector('input');
+            var label = container.querySelector('b');
+
+            function show(index) {
+                layer.eachLayer(function(shape) {
+                    var name = shape.feature.properties.name;
+                    var value = values[name] ? values[name][index] : null;
+                    shape.feature.properties[field] = value;
+                    shape.setStyle({fillColor: value === null ? 'gray' : colors[name][index]});
+                });
+                slider.value = index;
+                label.textContent = years[index];
+            }
+
+            function stop() {
+                clearInterval(timer);
+                timer = null;
+                button.innerHTML = '&#9654;';
+            }
+
+            slider.addEventListener('input', function() {
+                stop();
+                show(parseInt(slider.value, 10));
+            });
+            button.addEventListener('click', function() {
+                if (timer !== null) {
+                    stop();
+                    return;
+                }
+                button.innerHTML = '&#10074;&#10074;';
+                timer = setInterval(function() {
+                    show((parseInt(slider.value, 10) + 1) % years.length);
+                }, {{ this.interval }});
+            });
+
+            show({{ this.start }});
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, years, values, colors, field, start=0, interval=800):
+        super().__init__()
+        self._name = 'YearAnimation'
+        self.years = years
+        self.values = values
+        self.colors = colors
+        self.field = field
+        self.start = start
+        self.interval = interval
+
+
+def year_choropleth(shapes, table, field, caption, location, zoom, start_year=None):
+    """folium Map of ``table`` (columns year, name, ``field``) over ``shapes``, animated by year in the browser.
+
+    The geometry is sent once together with a year x country matrix of values
+    and colors on a single scale covering every year.
+    """
+    matrix = table.pivot(index='name', columns='year', values=field).sort_index(axis=1)
+    years = [int(year) for year in matrix.columns]
+    start = years.index(start_year) if start_year in years else 0
+
+    colormap = linear.Reds_09.scale(float(table[field].min()), float(table[field].max()))
+    colormap.caption = caption
+
+    values, colors = {}, {}
+    for name, row in matrix.iterrows():
+        values[name] = [None if v != v else round(float(v), 6) for v in row]
+        colors[name] = [None if v != v else colormap(v) for v in row]
+
+    first = {name: row[start] for name, row in values.items()}
+    m = folium.Map(location=location, zoom_start=zoom)
+    layer = folium.GeoJson(
+        with_values(shapes, first, field),
+        style_function=lambda feature: {
+            'fillColor': colormap(feature['properties'][field]) if feature['properties'][field] else 'gray',
+            'color': 'black',
+            'weight': 1,
+            'fillOpacity': 0.7,
+        },
+        tooltip=folium.GeoJsonTooltip(
+            fields=['name', field],
+            aliases=['Country:', 'Rate:'],
+            localize=True
+        )
+    )
+    layer.add_child(YearAnimation(years, values, colors, field, start=start))
+    layer.add_to(m)
+    colormap.add_to(m)
+    return m
@@ -0,0 +1,138 @@
+import numpy as np
+import plotly.io as pio
+import streamlit.components.v1 as components
+from plotly.colors import qualitative, sample_colorscale
+
+from charts import figure_cache, fingerprint
+from profiling import section
+
+# Points kept per series; longer series are reduced to the min and max of each bucket of years
+MAX_POINTS = 400
+
+# Line colors for up to len(COLORS) series; more series take evenly spaced colors of COLORSCALE instead
+COLORS = qualitative.Plotly
+COLORSCALE = 'Turbo'
+
+# Series are labelled at their last point only when there are few enough to read
+MAX_LABELS = 25
+
+# Hovering a line fades every other one, entirely in the browser
+HIGHLIGHT_SCRIPT = """
+var plot = document.getElementById('{plot_id}');
+var current = null;
+plot.on('plotly_hover', function(event) {
+    var hovered = event.points[0].curveNumber;
+    if (hovered === current) return;
+    current = hovered;
+    Plotly.restyle(plot, {
+        opacity: plot.data.map(function(trace, i) { return i === hovered ? 1 : 0.15; }),
+        'line.width': plot.data.map(function(trace, i) { return i === hovered ? 3 : 1.5; })
+    });
+});
+plot.on('plotly_unhover', function() {
+    current = null;
+    Plotly.restyle(plot, {opacity: 1, 'line.width': 1.5});
+});
+"""
+
+
+def trend_matrix(cube, column='val', **filters):
+    """Year x location matrix of the mean of ``column``, NaN where a location has no data for a year."""
+    means = cube.mean('year', 'location', column=column, **filters)
+    return means.pivot(index='year', columns='location', values=column).sort_index()
+
+
+def downsample(matrix, max_points=MAX_POINTS):
+    """Row positions and values of every series of ``matrix``, at most ``max_points`` per series.
+
+    Series no longer than ``max_points`` are returned whole. Longer ones are
+    cut into buckets of consecutive years and keep the minimum and maximum
+    of each bucket, in year order, so peaks survive the reduction. Both
+    arrays are (points x series).
+    """
+    values = matrix.to_numpy(dtype='float64')
+    length, count = values.shape
+    if length <= max_points:
+        return np.repeat(np.arange(length)[:, None], count, axis=1), values
+
+    buckets = max_points // 2
+    size = -(-length // buckets)
+    padded = np.full((buckets * size, count), np.nan)
+    padded[:length] = values
+    blocks = padded.reshape(buckets, size, count)
+    empty = np.isnan(blocks).all(axis=1)
+    low = np.argmin(np.where(np.isnan(blocks), np.inf, blocks), axis=1)
+    high = np.argmax(np.where(np.isnan(blocks), -np.inf, blocks), axis=1)
+
+    offsets = (np.arange(buckets) * size)[:, None]
+    rows = np.stack([np.minimum(low, high), np.maximum(low, high)], axis=1) + offsets[:, None]
+    rows = np.minimum(rows, length - 1).reshape(2 * buckets, count)
+    points = np.take_along_axis(values, rows, axis=0)
+    points[np.repeat(empty, 2, axis=0)] = np.nan
+    return rows, points
+
+
+def palette(count):
+    """``count`` distinct line colors."""
+    if count <= len(COLORS):
+        return list(COLORS[:count])
+    return sample_colorscale(COLORSCALE, list(np.linspace(0, 1, count)))
+
+
+def trend_html(matrix, countries=None, max_points=MAX_POINTS, height=600):
+    """Standalone HTML of a WebGL line chart with one series per column of ``matrix``, or per one of ``countries``.
+
+    Colors follow each country's position in the whole matrix, so filtering
+    never recolors the countries that remain.
+    """
+    colors = dict(zip(matrix.columns, palette(len(matrix.columns))))
+    if countries:
+        matrix = matrix[list(countries)]
+    years = matrix.index.to_numpy()
+    rows, points = downsample(matrix, max_points)
+
+    # A plain figure dict skips plotly's per-trace validation, which dominates with hundreds of series
+    traces = [{
+        'type': 'scattergl',
+        'x': years[rows[:, position]],
+        'y': points[:, position],
+        'mode': 'lines',
+        'name': location,
+        'line': {'width': 1.5, 'color': colors[location]},
+        'hovertemplate': '%{fullData.name}<br>%{x}: %{y:.4g}<extra></extra>',
+    } for position, location in enumerate(matrix.columns)]
+
+    labels = []
+    if len(matrix.columns) <= MAX_LABELS:
+        for location in matrix.columns:
+            series = matrix[location].dropna()
+            if len(series):
+                labels.append({'x': series.index[-1], 'y': series.iloc[-1], 'text': location, 'showarrow': False,
+                               'xanchor': 'left', 'xshift': 4, 'font': {'color': colors[location]}})
+
+    layout = {
+        'height': height,
+        'showlegend': False,
+        'hovermode': 'closest',
+        'margin': {'t': 20, 'b': 40, 'l': 40, 'r': 120},
+        'xaxis': {'title': {'text': 'Year'}},
+        'yaxis': {'title': {'text': 'Deaths (Percent)'}, 'showticklabels': False},
+        'annotations': labels,
+    }
+    return pio.to_html({'data': traces, 'layout': layout}, validate=False, include_plotlyjs='cdn',
+                       config={'responsive': True, 'displaylogo': False},
+                       post_script=HIGHLIGHT_SCRIPT, default_height=height)
+
+
+def show_trends(matrix, countries=None, max_points=MAX_POINTS, height=600):
+    """Display the trend chart of ``matrix`` (only ``countries`` if given), reusing the HTML of identical earlier requests."""
+    with section('trend chart', series=len(countries) if countries else len(matrix.columns)) as info:
+        cache = figure_cache()
+        key = fingerprint(trend_html, (matrix,), {'countries': list(countries or []), 'max_points': max_points, 'height': height})
+        html = cache.get(key)
+        info['cached'] = html is not None
+        if html is None:
+            html = trend_html(matrix, countries, max_points, height).encode()
+            cache.put(key, html)
+        info['payload_bytes'] = len(html)
+        components.html(html.decode(), height=height + 20)
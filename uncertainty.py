@@ -0,0 +1,63 @@
+from statistics import NormalDist
+
+import numpy as np
+
+# GBD upper/lower columns are the bounds of 95% uncertainty intervals
+Z95 = NormalDist().inv_cdf(0.975)
+
+# How row intervals combine when rows are summed: 'independent' adds the
+# row variances, 'correlated' assumes every row moves together and adds the
+# bounds themselves (the widest band consistent with the row intervals)
+METHODS = ['independent', 'correlated']
+
+
+def row_variances(frame):
+    """Variances below and above ``val`` for each row, from a split normal fitted to ``lower``/``val``/``upper``.
+
+    GBD intervals are often asymmetric, so each side gets its own spread.
+    """
+    val = frame['val'].to_numpy(dtype='float64')
+    below = np.clip(val - frame['lower'].to_numpy(dtype='float64'), 0, None) / Z95
+    above = np.clip(frame['upper'].to_numpy(dtype='float64') - val, 0, None) / Z95
+    return below ** 2, above ** 2
+
+
+def interval(cube, *by, how='independent', statistic='total', level=0.95, **filters):
+    """``statistic`` ('total' or 'mean') of ``val`` by ``by`` with its ``level`` interval as ``lower``/``upper``.
+
+    Everything comes from the cube's summed cells, so the cost depends on
+    the size of the result rather than on the number of raw rows.
+    """
+    if how not in METHODS:
+        raise ValueError(f"Unknown interval method: {how!r}")
+    cells = cube.rollup(*by, **filters)
+    scale = cells['n'].to_numpy(dtype='float64') if statistic == 'mean' else 1.0
+    z = NormalDist().inv_cdf(0.5 + level / 2) / Z95
+
+    val = cells['val'].to_numpy() / scale
+    if how == 'correlated':
+        below = (cells['val'] - cells['lower']).to_numpy() / scale
+        above = (cells['upper'] - cells['val']).to_numpy() / scale
+    else:
+        below = Z95 * np.sqrt(cells['var_lower'].to_numpy()) / scale
+        above = Z95 * np.sqrt(cells['var_upper'].to_numpy()) / scale
+
+    result = cells[list(by)].copy()
+    result['val'] = val
+    result['lower'] = val - z * below
+    result['upper'] = val + z * above
+    return result
+
+
+def interval_errors(frame):
+    """``[below, above]`` distances for matplotlib's xerr/yerr, or None when ``frame`` has no interval."""
+    if 'lower' not in frame:
+        return None
+    return [frame['val'] - frame['lower'], frame['upper'] - frame['val']]
+
+
+def summary(cube, *by, how=None, statistic='total', **filters):
+    """``cube.total``/``cube.mean`` by ``by``, with ``lower``/``upper`` added when ``how`` names a method."""
+    if how is None:
+        return getattr(cube, 'mean' if statistic == 'mean' else 'total')(*by, **filters)
+    return interval(cube, *by, how=how, statistic=statistic, **filters)